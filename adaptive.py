@@ -0,0 +1,108 @@
+import asyncio, time
+from typing import Callable, List, Optional, Tuple
+
+# ---------------------------------------------------------------------
+# AIMD concurrency control for browser writers and in-flight LLM calls
+# ---------------------------------------------------------------------
+class WorkerGate:
+    """
+    Workers 1..limit are active; the rest park in `wait_active` (and drop their
+    browser context) until the limit grows again or the gate is opened for shutdown.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._cond = asyncio.Condition()
+        self._open = False
+
+    def active(self, worker_id: int) -> bool:
+        return self._open or worker_id <= self.limit
+
+    async def wait_active(self, worker_id: int):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active(worker_id))
+
+    async def set_limit(self, n: int):
+        async with self._cond:
+            self.limit = n
+            self._cond.notify_all()
+
+    async def open_all(self):
+        """Wake every parked worker (used at shutdown so each one sees its sentinel)."""
+        async with self._cond:
+            self._open = True
+            self._cond.notify_all()
+
+class AimdController:
+    """
+    Additive increase / multiplicative decrease over fixed windows: a window with a
+    429, too many errors or p90 latency above `target_s` cuts the limit by
+    `decrease`; a clean window in which the limit was actually reached (and
+    `demand()` says more work is waiting) adds one.
+    """
+    def __init__(self, name: str, limit: int, lo: int, hi: int, apply: Callable[[int], object],
+                 target_s: float, max_error_rate: float = 0.1, decrease: float = 0.5, min_samples: int = 3,
+                 demand: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.lo, self.hi = max(1, lo), max(1, lo, hi)
+        self.limit = min(self.hi, max(self.lo, limit))
+        self.apply = apply
+        self.target_s = target_s
+        self.max_error_rate = max_error_rate
+        self.decrease = decrease
+        self.min_samples = min_samples
+        self.demand = demand
+        self.changes: List[Tuple[float, int, int, str]] = []  # (time, old, new, reason)
+        self._reset_window()
+
+    def _reset_window(self):
+        self._lat: List[float] = []
+        self._errors = 0
+        self._throttled = 0
+        self._peak = 0
+
+    def observe(self, seconds: float, ok: bool = True, throttled: bool = False):
+        self._lat.append(seconds)
+        self._errors += int(not ok)
+        self._throttled += int(throttled)
+
+    def note_load(self, in_use: int):
+        self._peak = max(self._peak, in_use)
+
+    def _decide(self) -> Tuple[int, str]:
+        n = len(self._lat)
+        p90 = sorted(self._lat)[int(0.9 * (n - 1))] if n else 0.0
+        if self._throttled:
+            return int(self.limit * self.decrease), f"{self._throttled} rate-limit responses"
+        if n >= self.min_samples and self._errors / n > self.max_error_rate:
+            return int(self.limit * self.decrease), f"error rate {self._errors}/{n}"
+        if n >= self.min_samples and p90 > self.target_s:
+            return int(self.limit * self.decrease), f"p90 {p90:.2f}s > {self.target_s:.2f}s"
+        if n >= self.min_samples and self._peak >= self.limit and (self.demand is None or self.demand()):
+            return self.limit + 1, f"saturated, p90 {p90:.2f}s, {self._errors}/{n} errors"
+        return self.limit, ""
+
+    async def tick(self) -> Optional[str]:
+        new, reason = self._decide()
+        new = min(self.hi, max(self.lo, new))
+        self._reset_window()
+        if new == self.limit:
+            return None
+        old, self.limit = self.limit, new
+        self.changes.append((time.time(), old, new, reason))
+        res = self.apply(new)
+        if asyncio.iscoroutine(res):
+            await res
+        return f"[adapt] {self.name}: {old} → {new} ({reason})"
+
+    def summary(self) -> str:
+        ups = sum(1 for _, o, n, _ in self.changes if n > o)
+        return (f"Adaptive {self.name}: final {self.limit} (bounds {self.lo}-{self.hi}), "
+                f"{ups} increases, {len(self.changes) - ups} decreases")
+
+async def run_controllers(controllers: List[AimdController], interval_s: float):
+    while True:
+        await asyncio.sleep(interval_s)
+        for c in controllers:
+            line = await c.tick()
+            if line:
+                print(line)
@@ -0,0 +1,129 @@
+import asyncio, json, os
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from dead_letter import DeadLetterStream, load_dead_letters
+from run_journal import row_key
+
+# ---------------------------------------------------------------------
+# two-phase offline mode: Batch API requests file -> validated payloads -> apply
+# ---------------------------------------------------------------------
+TERMINAL = ("completed", "failed", "expired", "cancelled")
+
+def manifest_path(requests_path: str) -> str:
+    """batch_requests.jsonl -> batch_requests.rows.json (custom_id -> row, the batch id and whether it was collected)."""
+    root, _ = os.path.splitext(requests_path)
+    return f"{root}.rows.json"
+
+def pending_batch(requests_path: str) -> Optional[str]:
+    """The batch id recorded for this requests file if it was submitted and never collected."""
+    try:
+        manifest = load_manifest(requests_path)
+    except (OSError, ValueError):
+        return None
+    return None if manifest.get("collected") else manifest.get("batch_id")
+
+def write_requests(rows: Iterable[Dict], path: str, body_for: Callable[[str], Dict],
+                   skip: Iterable[str] = ()) -> int:
+    """
+    One /v1/chat/completions request per row, custom_id = the row key, so a result maps
+    to its row whichever file or manifest it is read with. Rows whose key is in `skip`
+    (already have a stored payload) are left out. Refuses to replace a manifest whose
+    batch was submitted but not collected yet. Returns the request count.
+    """
+    pending = pending_batch(path)
+    if pending:
+        raise RuntimeError(f"batch {pending} for {path} has not been collected yet")
+    skip = set(skip)
+    manifest: Dict[str, Dict] = {}
+    with open(path, "w", encoding="utf-8") as f:
+        for r in rows:
+            cid = row_key(r["Product Name"], r.get("SKU"))
+            if cid in skip or cid in manifest:
+                continue
+            manifest[cid] = {"Product Name": r["Product Name"], "SKU": r.get("SKU", ""), "Row Hash": r.get("Row Hash", "")}
+            f.write(json.dumps({"custom_id": cid, "method": "POST", "url": "/v1/chat/completions",
+                                "body": body_for(r["Product Name"])}, ensure_ascii=False) + "\n")
+    save_manifest(path, {"batch_id": None, "collected": False, "rows": manifest})
+    return len(manifest)
+
+def load_manifest(requests_path: str) -> Dict:
+    with open(manifest_path(requests_path), encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(requests_path: str, manifest: Dict):
+    tmp = manifest_path(requests_path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, manifest_path(requests_path))
+
+async def submit(client, requests_path: str) -> str:
+    """Upload the requests file and start a 24h batch; returns the batch id."""
+    with open(requests_path, "rb") as f:
+        uploaded = await client.files.create(file=f, purpose="batch")
+    batch = await client.batches.create(input_file_id=uploaded.id, endpoint="/v1/chat/completions",
+                                        completion_window="24h")
+    return batch.id
+
+async def wait(client, batch_id: str, poll_s: float):
+    """Poll until the batch reaches a terminal status."""
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        done = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ""
+        print(f"[batch] {batch_id}: {batch.status}{done}")
+        if batch.status in TERMINAL:
+            return batch
+        await asyncio.sleep(poll_s)
+
+async def download(client, file_id: Optional[str]) -> str:
+    if not file_id:
+        return ""
+    content = await client.files.content(file_id)
+    return content.text
+
+def parse_results(text: str) -> Iterator[Tuple[str, Optional[str], object, Optional[str]]]:
+    """(custom_id, message content, usage, error) for every line of a batch output/error file."""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            r = json.loads(line)
+        except ValueError:
+            continue
+        cid = r.get("custom_id", "")
+        resp = r.get("response") or {}
+        body = resp.get("body") or {}
+        if r.get("error") or resp.get("status_code", 200) != 200:
+            err = r.get("error") or body.get("error") or {}
+            yield cid, None, None, err.get("message") if isinstance(err, dict) else str(err)
+            continue
+        try:
+            content = body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            yield cid, None, None, "no message in response"
+            continue
+        usage = body.get("usage")
+        if isinstance(usage, dict):  # same attribute access as an SDK usage object
+            usage = SimpleNamespace(**{k: SimpleNamespace(**v) if isinstance(v, dict) else v for k, v in usage.items()})
+        yield cid, content, usage, None
+
+class BatchPayloads:
+    """Validated payloads keyed by row (JSONL, same entry shape as dead letters: the latest line per row wins)."""
+    def __init__(self, path: str):
+        self.path = path
+        self.added = 0
+
+    def keys(self) -> set:
+        if not os.path.exists(self.path):
+            return set()
+        return {row_key(e.get("Product Name", ""), e.get("SKU")) for e in load_dead_letters(self.path)}
+
+    def add(self, row: Dict, payload: Dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({**row, "payload": payload}, ensure_ascii=False) + "\n")
+        self.added += 1
+
+class PayloadStream(DeadLetterStream):
+    """Feeds stored payloads through the pipeline in place of the sheet; nothing is generated."""
@@ -0,0 +1,324 @@
+import html, json, re, threading, time, uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# ---------------------------------------------------------------------
+# local stand-in for Odoo (login, PIM kanban, product form) + chat completions
+# ---------------------------------------------------------------------
+# form label -> (field name, editor kind); mirrors PAYLOAD_FIELDS in odoo_poc_batch.py
+FORM_FIELDS = [
+    ("Override Preview Description", "override_preview_description", "rich"),
+    ("Override Summary Description", "override_summary_description", "rich"),
+    ("Override Full Description", "override_full_description", "rich"),
+    ("Website Slug", "seo_name", "input"),
+    ("Meta Title", "website_meta_title", "input"),
+    ("Meta Description", "website_meta_description", "input"),
+]
+SESSION_COOKIE = "session_id=bench"
+
+PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title></head><body>{body}</body></html>"""
+
+NAVBAR = """<nav class="o_main_navbar"><a class="o_menu_apps" href="/web">Apps</a>
+<a class="o_app" href="/web/pim"><span class="o_caption">PIM</span></a></nav>"""
+
+LOGIN_BODY = """<form method="post" action="/web/login" class="oe_login_form">
+<input name="login" type="text"><input name="password" type="password">
+<button type="submit">Log in</button></form>"""
+
+KANBAN_JS = """<script>
+document.querySelector('.o_searchview_input').addEventListener('keydown', e => {
+  if (e.key !== 'Enter') return;
+  const q = e.target.value.toLowerCase();
+  for (const r of document.querySelectorAll('.o_kanban_record'))
+    r.style.display = r.textContent.toLowerCase().includes(q) ? '' : 'none';
+});
+</script>"""
+
+FORM_JS = """<script>
+const form = document.querySelector('.o_form_view');
+document.querySelector('#tab_website').addEventListener('click', () => {
+  document.querySelector('#page_general').style.display = 'none';
+  document.querySelector('#page_website').style.display = '';
+});
+document.querySelector('.o_form_button_edit').addEventListener('click', () => form.classList.add('o_form_editable'));
+document.querySelector('.o_form_button_save').addEventListener('click', async () => {
+  const values = {};
+  for (const w of document.querySelectorAll('.o_field_widget[name]')) {
+    const ed = w.querySelector('[contenteditable], input');
+    values[w.getAttribute('name')] = ed.isContentEditable ? ed.innerText : ed.value;
+  }
+  await fetch('/web/dataset/call_kw/product.template/web_save', {
+    method: 'POST', headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({params: {args: [[form.dataset.id], values]}}),
+  });
+});
+</script>"""
+
+def _fake_payload(name: str) -> dict:
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    return {
+        "override_preview_description": f"{name} built for everyday work. Reliable and easy to use.",
+        "override_summary_description": (f"The {name} is made for daily use. It is durable. It is easy to handle. "
+                                         f"It fits most jobs. It is a solid choice."),
+        "override_full_description": (f"**{name}**\n\n**PRODUCT OVERVIEW**\nA dependable {name} for the shop.\n\n"
+                                      f"**KEY FEATURES**\n- Durable build\n- Easy to use"),
+        "website_slug": slug,
+        "meta_title": name[:60],
+        "meta_description": f"Shop the {name}: durable, dependable and ready to work."[:155],
+    }
+
+def fake_completion(prompt: str) -> str:
+    """Answer the single- or multi-product prompt from odoo_poc_batch with well-formed JSON."""
+    listing = re.search(r"PRODUCTS \(id: product name\):\n(.*)", prompt, re.S)
+    if listing:
+        ids = re.findall(r"^- (\w+): (.*)$", listing.group(1), re.M)
+        return json.dumps({pid: _fake_payload(name) for pid, name in ids})
+    m = re.search(r"^PRODUCT: (.*)$", prompt, re.M)
+    return json.dumps(_fake_payload(m.group(1).strip() if m else "Product"))
+
+class FakeOdoo:
+    """
+    Products live in memory; `odoo_latency` is added to every Odoo request and
+    `llm_latency` to every chat completion (seconds).
+    """
+    def __init__(self, product_names: List[str], odoo_latency: float = 0.0, llm_latency: float = 0.5):
+        self.odoo_latency = odoo_latency
+        self.llm_latency = llm_latency
+        self.lock = threading.Lock()
+        self.requests = {"odoo": 0, "llm": 0, "saves": 0}
+        self.reset(product_names)
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    def reset(self, product_names: List[str]):
+        with self.lock:
+            self.products: Dict[int, dict] = {
+                i + 1: {"name": n, **{f: "" for _, f, _ in FORM_FIELDS}} for i, n in enumerate(product_names)
+            }
+            self.requests = {"odoo": 0, "llm": 0, "saves": 0}
+            self.prefixes: set = set()
+            self.files: Dict[str, dict] = {}
+            self.batches: Dict[str, dict] = {}
+
+    def count(self, kind: str):
+        with self.lock:
+            self.requests[kind] += 1
+
+    def cached_tokens(self, prompt: str) -> int:
+        """Like OpenAI's prefix cache: 128-token blocks of an exact prefix seen before, from 1024 tokens on."""
+        blocks = 0
+        with self.lock:
+            for k in range(1, len(prompt) // 512 + 1):
+                h = hash(prompt[:k * 512])
+                if h in self.prefixes and blocks == k - 1:
+                    blocks = k
+                self.prefixes.add(h)
+        return blocks * 128 if blocks * 128 >= 1024 else 0
+
+    def chat_response(self, req: dict) -> dict:
+        self.count("llm")
+        prompt = req.get("messages", [{}])[-1].get("content", "")
+        content = fake_completion(prompt)
+        pt, ct = len(prompt) // 4, len(content) // 4
+        cached = self.cached_tokens(prompt)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": int(time.time()),
+            "model": req.get("model", "bench"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": pt, "completion_tokens": ct, "total_tokens": pt + ct,
+                      "prompt_tokens_details": {"cached_tokens": cached}},
+        }
+
+    # ── Batch API stand-in: files + batches, completed `llm_latency` after creation ──
+    def add_file(self, filename: str, data: bytes, purpose: str) -> dict:
+        f = {"id": f"file-{uuid.uuid4().hex[:12]}", "object": "file", "bytes": len(data), "created_at": int(time.time()),
+             "filename": filename, "purpose": purpose, "status": "processed"}
+        with self.lock:
+            self.files[f["id"]] = {**f, "data": data}
+        return f
+
+    def file_content(self, file_id: str) -> Optional[bytes]:
+        with self.lock:
+            f = self.files.get(file_id)
+        return f["data"] if f else None
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> Optional[dict]:
+        if self.file_content(input_file_id) is None:
+            return None
+        b = {"id": f"batch_{uuid.uuid4().hex[:12]}", "object": "batch", "endpoint": endpoint,
+             "input_file_id": input_file_id, "completion_window": completion_window, "status": "in_progress",
+             "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+             "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+        with self.lock:
+            self.batches[b["id"]] = b
+        threading.Thread(target=self._run_batch, args=(b,), daemon=True).start()
+        return dict(b)
+
+    def _run_batch(self, b: dict):
+        time.sleep(self.llm_latency)
+        out = []
+        lines = [l for l in self.file_content(b["input_file_id"]).decode("utf-8").splitlines() if l.strip()]
+        for line in lines:
+            r = json.loads(line)
+            out.append(json.dumps({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": r["custom_id"],
+                                   "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                                "body": self.chat_response(r["body"])},
+                                   "error": None}))
+        f = self.add_file(f"{b['id']}_output.jsonl", ("\n".join(out) + "\n").encode("utf-8"), "batch_output")
+        with self.lock:
+            b.update(status="completed", output_file_id=f["id"], completed_at=int(time.time()),
+                     request_counts={"total": len(lines), "completed": len(out), "failed": 0})
+
+    def batch(self, batch_id: str) -> Optional[dict]:
+        with self.lock:
+            b = self.batches.get(batch_id)
+            return dict(b) if b else None
+
+    # ── pages ──
+    def kanban_html(self) -> str:
+        cards = "".join(f'<a class="o_kanban_record" href="/web/form/{rid}">{html.escape(p["name"])}</a>'
+                        for rid, p in self.products.items())
+        body = (f'{NAVBAR}<div class="o_control_panel"><input class="o_searchview_input" placeholder="Search..."></div>'
+                f'<div class="o_kanban_view">{cards}</div>{KANBAN_JS}')
+        return PAGE.format(title="PIM", body=body)
+
+    def form_html(self, rid: int) -> Optional[str]:
+        p = self.products.get(rid)
+        if p is None:
+            return None
+        rows = []
+        for label, field, kind in FORM_FIELDS:
+            v = html.escape(p[field])
+            editor = (f'<div id="f_{field}" class="note-editable" contenteditable="true">{v}</div>' if kind == "rich"
+                      else f'<input id="f_{field}" type="text" value="{v}">')
+            rows.append(f'<div class="o_wrap_label"><label for="f_{field}">{label}</label></div>'
+                        f'<div class="o_field_widget" name="{field}">{editor}</div>')
+        body = (f'{NAVBAR}<div class="o_form_view" data-id="{rid}">'
+                f'<button class="o_form_button_edit">Edit</button><button class="o_form_button_save">Save</button>'
+                f'<h1>{html.escape(p["name"])}</h1>'
+                f'<div class="o_notebook"><a role="tab" class="nav-link">General Information</a>'
+                f'<a role="tab" class="nav-link" id="tab_website">Website</a></div>'
+                f'<div id="page_general">General</div>'
+                f'<div id="page_website" style="display:none">{"".join(rows)}</div></div>{FORM_JS}')
+        return PAGE.format(title=p["name"], body=body)
+
+    # ── server ──
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.httpd = ThreadingHTTPServer((host, port), _handler_for(self))
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.httpd.server_address[1]}"
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+def _handler_for(app: FakeOdoo):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, body: str = "", ctype: str = "text/html; charset=utf-8", headers=()):
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _redirect(self, to: str, headers=()):
+            self._send(303, "", headers=(("Location", to), *headers))
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _logged_in(self) -> bool:
+            return SESSION_COOKIE in (self.headers.get("Cookie") or "")
+
+        def do_GET(self):
+            path = urlparse(self.path).path.rstrip("/") or "/"
+            if path.startswith("/v1/"):
+                m = re.fullmatch(r"/v1/batches/([\w-]+)", path)
+                if m:
+                    return self._json(app.batch(m.group(1)))
+                m = re.fullmatch(r"/v1/files/([\w-]+)/content", path)
+                data = app.file_content(m.group(1)) if m else None
+                if data is None:
+                    return self._send(404, "{}", "application/json")
+                return self._send(200, data.decode("utf-8"), "application/octet-stream")
+            app.count("odoo")
+            time.sleep(app.odoo_latency)
+            if path == "/web/login":
+                return self._send(200, PAGE.format(title="Login", body=LOGIN_BODY))
+            if not self._logged_in():
+                return self._redirect("/web/login")
+            if path in ("/", "/web"):
+                return self._send(200, PAGE.format(title="Odoo", body=NAVBAR + '<div class="o_home_menu"></div>'))
+            if path == "/web/pim":
+                return self._send(200, app.kanban_html())
+            m = re.fullmatch(r"/web/form/(\d+)", path)
+            page = app.form_html(int(m.group(1))) if m else None
+            if page is None:
+                return self._send(404, "not found")
+            self._send(200, page)
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            body = self._body()
+            if path.endswith("/chat/completions"):
+                return self._chat(json.loads(body or b"{}"))
+            if path == "/v1/files":
+                return self._upload(body)
+            if path == "/v1/batches":
+                req = json.loads(body or b"{}")
+                return self._json(app.create_batch(req.get("input_file_id", ""), req.get("endpoint", ""),
+                                                   req.get("completion_window", "24h")))
+            app.count("odoo")
+            time.sleep(app.odoo_latency)
+            if path == "/web/login":
+                form = parse_qs(body.decode("utf-8"))
+                if not form.get("login") or not form.get("password"):
+                    return self._send(200, PAGE.format(title="Login", body=LOGIN_BODY))
+                return self._redirect("/web", headers=(("Set-Cookie", f"{SESSION_COOKIE}; Path=/"),))
+            if path.startswith("/web/dataset/call_kw/") and path.endswith("/web_save"):
+                if not self._logged_in():
+                    return self._send(403, "{}", "application/json")
+                (ids, values) = json.loads(body)["params"]["args"]
+                with app.lock:
+                    rec = app.products.get(int(ids[0]))
+                    if rec is not None:
+                        rec.update({k: v for k, v in values.items() if k in rec})
+                app.count("saves")
+                return self._send(200, json.dumps({"jsonrpc": "2.0", "result": True}), "application/json")
+            self._send(404, "not found")
+
+        def _chat(self, req: dict):
+            time.sleep(app.llm_latency)
+            self._send(200, json.dumps(app.chat_response(req)), "application/json")
+
+        def _json(self, obj: Optional[dict]):
+            if obj is None:
+                return self._send(404, json.dumps({"error": {"message": "not found"}}), "application/json")
+            self._send(200, json.dumps(obj), "application/json")
+
+        def _upload(self, body: bytes):
+            # multipart/form-data from the SDK's files.create: fields "purpose" and "file"
+            msg = BytesParser(policy=default_policy).parsebytes(
+                b"Content-Type: " + self.headers.get("Content-Type", "").encode("latin-1") + b"\r\n\r\n" + body)
+            parts = {p.get_param("name", header="content-disposition"): p for p in msg.iter_parts()}
+            upload = parts.get("file")
+            if upload is None:
+                return self._send(400, json.dumps({"error": {"message": "no file"}}), "application/json")
+            purpose = parts["purpose"].get_content().strip() if "purpose" in parts else "batch"
+            self._json(app.add_file(upload.get_filename() or "upload.jsonl", upload.get_payload(decode=True), purpose))
+
+    return Handler
@@ -0,0 +1,155 @@
+import argparse, csv, json, os, subprocess, sys, tempfile, time
+from datetime import datetime
+from typing import List, Optional
+
+from bench_server import FakeOdoo
+from page_memory import tree_rss_mb
+
+# ---------------------------------------------------------------------
+# offline benchmark: odoo_poc_batch against the local fake Odoo + fake LLM
+# ---------------------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "odoo_poc_batch.py")
+KEY_STAGES = ["item_total", "login", "goto_pim", "search_open", "website_edit", "check_filled",
+              "generate", "llm_call", "save"]
+
+def product_names(n: int) -> List[str]:
+    brands = ["Milwaukee", "Wix", "DeWalt", "Makita", "Bosch"]
+    kinds = ["Impact Driver", "Air Filter", "Hammer Drill", "Spin-On Lube Filter", "Circular Saw"]
+    return [f"{brands[i % 5]} {48000 + i} {kinds[(i // 5) % 5]}" for i in range(n)]
+
+def write_csv(path: str, names: List[str]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Product Name", "SKU"])
+        w.writerows((n, f"BENCH-{i:05d}") for i, n in enumerate(names))
+
+def run_case(server: FakeOdoo, base_url: str, names: List[str], concurrency: int, batch_size: int,
+             headless: bool, timeout_s: float) -> dict:
+    server.reset(names)
+    with tempfile.TemporaryDirectory(prefix="odoo_bench_") as work:
+        csv_path = os.path.join(work, "rows.csv")
+        write_csv(csv_path, names)
+        env = dict(os.environ)
+        env.update({
+            "OD_URL": f"{base_url}/web/login", "OD_EMAIL": "bench", "OD_PASS": "bench",
+            "OPENAI_API_KEY": "bench", "OPENAI_BASE_URL": f"{base_url}/v1",
+            "HEADLESS": "true" if headless else "false", "SLOWMO_MS": "0",
+            "MAX_CONCURRENT": str(concurrency), "GEN_BATCH_SIZE": str(batch_size), "BATCH_LIMIT": "0",
+            "BATCH_CSV_PATH": csv_path, "BATCH_CSV_URL": "", "SYNC_MODE": "full",
+            "WRITER_BACKEND": "browser", "RECORD_INDEX": "false", "PREFLIGHT_SCAN": "false", "GEN_CACHE": "off",
+            "AUTH_STATE_PATH": "auth_state.json", "RUN_JOURNAL_PATH": "run_journal.sqlite3",
+            "BATCH_LOG_PATH": "batch_log.csv", "METRICS_JSON_PATH": "run_metrics.json", "METRICS_PROM_PATH": "",
+        })
+        with open(os.path.join(work, "stdout.log"), "w") as log:
+            t0 = time.monotonic()
+            proc = subprocess.Popen([sys.executable, SCRIPT], cwd=work, env=env, stdout=log, stderr=subprocess.STDOUT)
+            peak = 0.0
+            while proc.poll() is None:
+                peak = max(peak, tree_rss_mb(proc.pid))
+                if time.monotonic() - t0 > timeout_s:
+                    proc.kill()
+                    break
+                time.sleep(0.25)
+            wall = time.monotonic() - t0
+        try:
+            with open(os.path.join(work, "run_metrics.json"), encoding="utf-8") as f:
+                m = json.load(f)
+        except (OSError, ValueError):
+            m = {}
+        if proc.returncode != 0 or not m:
+            with open(os.path.join(work, "stdout.log"), encoding="utf-8", errors="replace") as f:
+                tail = f.read()[-2000:]
+            print(f"  run failed (exit {proc.returncode}); last output:\n{tail}")
+    stages = m.get("stages", {})
+    updated = m.get("statuses", {}).get("updated", 0)
+    return {
+        "concurrency": concurrency, "batch_size": batch_size, "items": len(names),
+        "exit_code": proc.returncode, "wall_s": round(wall, 2),
+        "items_per_s": round(updated / wall, 3) if wall else 0.0,
+        "peak_rss_mb": round(peak, 1),
+        "statuses": m.get("statuses", {}),
+        "llm_calls": m.get("tokens", {}).get("calls", 0),
+        "stages": {s: {k: stages[s][k] for k in ("count", "p50_s", "p95_s", "p99_s")} for s in KEY_STAGES if s in stages},
+        "server": dict(server.requests),
+    }
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """Cases whose throughput fell by more than `tolerance` (fraction) against the baseline."""
+    old = {(r["concurrency"], r["batch_size"]): r for r in baseline.get("results", [])}
+    out = []
+    for r in results:
+        b = old.get((r["concurrency"], r["batch_size"]))
+        if b and b["items_per_s"] and r["items_per_s"] < b["items_per_s"] * (1 - tolerance):
+            out.append(f"c={r['concurrency']} b={r['batch_size']}: {r['items_per_s']} items/s "
+                       f"vs baseline {b['items_per_s']} ({100 * (r['items_per_s'] / b['items_per_s'] - 1):+.0f}%)")
+    return out
+
+def print_table(results: List[dict]):
+    print(f"\n{'conc':>4} {'batch':>5} {'items/s':>8} {'wall s':>7} {'peak MB':>8} {'item p50':>9} {'item p95':>9} "
+          f"{'llm p50':>8} {'calls':>5}  statuses")
+    for r in results:
+        st = r["stages"]
+        item, llm = st.get("item_total", {}), st.get("llm_call", {})
+        print(f"{r['concurrency']:>4} {r['batch_size']:>5} {r['items_per_s']:>8.3f} {r['wall_s']:>7.1f} "
+              f"{r['peak_rss_mb']:>8.0f} {item.get('p50_s', 0):>9.2f} {item.get('p95_s', 0):>9.2f} "
+              f"{llm.get('p50_s', 0):>8.2f} {r['llm_calls']:>5}  {r['statuses']}")
+
+def _ints(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark odoo_poc_batch against a local fake Odoo and LLM.")
+    ap.add_argument("--concurrency", default="1,2,4", help="MAX_CONCURRENT values (comma-separated)")
+    ap.add_argument("--batch-sizes", default="1,5", help="GEN_BATCH_SIZE values (comma-separated)")
+    ap.add_argument("--items", type=int, default=30, help="products per run")
+    ap.add_argument("--odoo-latency-ms", type=float, default=20, help="added to every fake Odoo request")
+    ap.add_argument("--llm-latency-ms", type=float, default=800, help="added to every fake chat completion")
+    ap.add_argument("--headed", action="store_true", help="show the browser")
+    ap.add_argument("--timeout", type=float, default=900, help="per-run timeout (s)")
+    ap.add_argument("--baseline", default="bench_baseline.json", help="baseline JSON to compare against / write")
+    ap.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed items/s drop vs baseline (fraction)")
+    args = ap.parse_args()
+
+    names = product_names(args.items)
+    server = FakeOdoo(names, args.odoo_latency_ms / 1000, args.llm_latency_ms / 1000)
+    base_url = server.start()
+    print(f"Fake Odoo + LLM at {base_url} (odoo {args.odoo_latency_ms:.0f} ms, llm {args.llm_latency_ms:.0f} ms)")
+    results = []
+    try:
+        for c in _ints(args.concurrency):
+            for b in _ints(args.batch_sizes):
+                print(f"→ MAX_CONCURRENT={c} GEN_BATCH_SIZE={b} ({args.items} items)")
+                results.append(run_case(server, base_url, names, c, b, not args.headed, args.timeout))
+    finally:
+        server.stop()
+    print_table(results)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {"items": args.items, "odoo_latency_ms": args.odoo_latency_ms, "llm_latency_ms": args.llm_latency_ms},
+        "results": results,
+    }
+    baseline: Optional[dict] = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance) if baseline and not args.save_baseline else []
+    failed = [r for r in results if r["exit_code"] != 0]
+    if failed:
+        print(f"\n{len(failed)} run(s) failed; baseline not written.")
+    elif baseline is None or args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    elif baseline.get("config") != report["config"]:
+        print(f"\nNote: baseline {args.baseline} was recorded with {baseline.get('config')}; comparison is approximate.")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if baseline is not None and not args.save_baseline and not regressions:
+        print(f"No throughput regressions vs {args.baseline} (tolerance {args.tolerance:.0%}).")
+    sys.exit(1 if regressions or failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import json, os
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+from run_journal import row_key
+
+# ---------------------------------------------------------------------
+# dead-letter file: items that failed every retry, with what they got so far
+# ---------------------------------------------------------------------
+class DeadLetters:
+    """Append-only JSONL; each line keeps the stage reached, the error, payload and record id."""
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+
+    def add(self, entry: Dict):
+        entry = {"failed_at": datetime.now().isoformat(timespec="seconds"), **entry}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+
+def load_dead_letters(path: str) -> List[Dict]:
+    """Entries of a dead-letter file, one per product (the latest failure wins)."""
+    latest: Dict[str, Dict] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            latest[row_key(e.get("Product Name", ""), e.get("SKU"))] = e
+    return list(latest.values())
+
+class DeadLetterStream:
+    """
+    Feeds a dead-letter file back through the pipeline in place of the sheet (same
+    attributes as SheetStream). Rows carry their saved payload and record id, so a
+    retry run skips generation and lookup for whatever was already done.
+    """
+    def __init__(self, path: str):
+        self.source = path
+        self.entries = load_dead_letters(path) if os.path.exists(path) else []
+        self.rows = len(self.entries)
+        self.duplicates = 0
+        self.not_modified = False
+        self.etag = self.last_modified = None
+
+    def __iter__(self) -> Iterator[Dict]:
+        for e in self.entries:
+            yield {
+                "Product Name": e.get("Product Name", ""),
+                "SKU": e.get("SKU", ""),
+                "Row Hash": e.get("Row Hash", ""),
+                "Payload": e.get("payload"),
+                "Record Id": e.get("record_id"),
+            }
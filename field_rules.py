@@ -0,0 +1,98 @@
+import re
+from typing import Dict, List
+
+# ---------------------------------------------------------------------
+# local per-field checks of generated payloads (mirrors the prompt's rules)
+# ---------------------------------------------------------------------
+PLACEHOLDERS = ("Name will be generated after saving", "(Item Name Here)", "(Key feature", "(Brief blurb")
+PAYLOAD_KEYS = ("override_preview_description", "override_summary_description", "override_full_description",
+                "website_slug", "meta_title", "meta_description")
+
+# "1/2 in. Hammer Drill", "No. 2": a period after these doesn't end a sentence
+ABBREVIATIONS = {"in", "ft", "oz", "lb", "lbs", "qt", "gal", "pt", "yd", "sq", "cu", "dia", "no", "approx",
+                 "vs", "e.g", "i.e", "pc", "pcs", "ea", "st", "mr", "dr"}
+
+def count_sentences(text: str) -> int:
+    """Sentence ends are . ! ? followed by a capital or digit, except after a unit abbreviation."""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    n, start = 0, 0
+    for m in re.finditer(r"[.!?]+[\"')\]]*\s+(?=[\"'(]?[A-Z0-9])", text):
+        word = re.search(r"([\w.]*)$", text[start:m.start()]).group(1).lower()
+        if m.group().startswith(".") and word in ABBREVIATIONS:
+            continue
+        if re.search(r"\w", text[start:m.end()]):
+            n += 1
+        start = m.end()
+    return n + (1 if re.search(r"\w", text[start:]) else 0)
+
+def _check_full(text: str, product_name: str) -> List[str]:
+    problems = []
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    if not lines or not re.fullmatch(r"\*\*.+\*\*", lines[0]) or product_name.lower() not in lines[0].lower():
+        problems.append(f"must start with the bold product name line **{product_name}**")
+    for heading in ("PRODUCT OVERVIEW", "KEY FEATURES"):
+        if f"**{heading}**" not in text:
+            problems.append(f"missing the **{heading}** heading")
+    if re.search(r"\*\*includes\*\*", text, re.I) and "**INCLUDES**" not in text:
+        problems.append('"INCLUDES" heading must be in all caps')
+    features = text.split("**KEY FEATURES**", 1)[1] if "**KEY FEATURES**" in text else ""
+    if "**KEY FEATURES**" in text and sum(1 for l in features.splitlines() if l.strip().startswith("- ")) < 2:
+        problems.append("KEY FEATURES needs at least 2 bullet lines starting with '- '")
+    return problems
+
+def check_field(key: str, value, product_name: str) -> List[str]:
+    """Problems with one field ([] = passes)."""
+    v = (value or "").strip() if isinstance(value, str) else ""
+    if not v:
+        return ["empty"]
+    problems = [f"contains template placeholder {p!r}" for p in PLACEHOLDERS if p in v]
+    if key == "override_preview_description":
+        n = count_sentences(v)
+        if n > 2:
+            problems.append(f"{n} sentences; at most 2")
+    elif key == "override_summary_description":
+        n = count_sentences(v)
+        if not 4 <= n <= 5:
+            problems.append(f"{n} sentences; must be 4-5")
+    elif key == "override_full_description":
+        problems += _check_full(v, product_name)
+    elif key == "meta_title" and len(v) > 60:
+        problems.append(f"{len(v)} characters; at most 60")
+    elif key == "meta_description" and len(v) > 155:
+        problems.append(f"{len(v)} characters; at most 155")
+    return problems
+
+def check_payload(data: Dict, product_name: str, keys=PAYLOAD_KEYS) -> Dict[str, List[str]]:
+    """{field: problems} for every failing field in `keys`."""
+    out = {}
+    for k in keys:
+        problems = check_field(k, data.get(k), product_name)
+        if problems:
+            out[k] = problems
+    return out
+
+class FieldStats:
+    """Per-field pass/fail on first generation, follow-up regenerations and what stayed broken."""
+    def __init__(self):
+        self.fields: Dict[str, Dict[str, int]] = {}
+
+    def _f(self, key: str) -> Dict[str, int]:
+        return self.fields.setdefault(key, {"passed": 0, "failed": 0, "regenerated": 0, "repaired": 0, "unresolved": 0})
+
+    def first_check(self, keys, failing):
+        for k in keys:
+            self._f(k)["failed" if k in failing else "passed"] += 1
+
+    def count(self, key: str, what: str):
+        self._f(key)[what] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        return {k: dict(v) for k, v in sorted(self.fields.items())}
+
+    def summary(self) -> str:
+        if not self.fields:
+            return "Field validation: nothing checked"
+        lines = ["Field validation (field: passed / failed, regenerated, repaired, unresolved):"]
+        for k, v in sorted(self.fields.items()):
+            lines.append(f"  {k}: {v['passed']} / {v['failed']}, {v['regenerated']}, {v['repaired']}, {v['unresolved']}")
+        return "\n".join(lines)
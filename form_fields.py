@@ -0,0 +1,104 @@
+import re, weakref
+from typing import Dict, List, Optional
+
+from playwright.async_api import Page, BrowserContext
+
+# ---------------------------------------------------------------------
+# one-evaluate form snapshot + label -> editor selector cache
+# ---------------------------------------------------------------------
+# kind -> CSS for that editor inside an Odoo field widget
+KIND_CSS = {
+    "rich": "[contenteditable='true'], .note-editable",
+    "textarea": "textarea",
+    "input": "input",
+}
+
+# Resolves every requested label to its editor and reads it in a single round trip.
+# Cached selectors are tried first; labels are (re)resolved through label[for] ->
+# .o_field_widget[name], and finally the same `following::` XPath the fill helpers use.
+SNAPSHOT_JS = r"""
+([specs, cached, kindCss]) => {
+  const KIND_XP = {
+    rich: "*[self::div[@contenteditable='true'] or contains(@class,'note-editable')]",
+    textarea: "textarea",
+    input: "input",
+  };
+  const xq = xp => document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  const find = sel => sel.startsWith("xpath=") ? xq(sel.slice(6)) : document.querySelector(sel.slice(4));
+  const read = (el, kind) => kind === "rich" ? el.innerText : el.value;
+  const out = {};
+  for (const [label, kinds] of Object.entries(specs)) {
+    let hit = null;
+    const c = cached[label];
+    if (c) {
+      const el = find(c.sel);
+      if (el) hit = {sel: c.sel, kind: c.kind, el};
+    }
+    const labXp = `//label[normalize-space(.)=${JSON.stringify(label)}]`;
+    const lab = hit ? null : xq(labXp);
+    if (lab && lab.htmlFor) {
+      const target = document.getElementById(lab.htmlFor);
+      const widget = target && (target.closest(".o_field_widget[name]") || target);
+      for (const kind of kinds) {
+        if (!widget || hit) break;
+        const el = widget.matches(kindCss[kind]) ? widget : widget.querySelector(kindCss[kind]);
+        const w = el && el.closest(".o_field_widget[name]");
+        if (!w) continue;
+        const base = `.o_field_widget[name="${w.getAttribute("name")}"]`;
+        const sel = el === w ? `css=${base}` : "css=" + kindCss[kind].split(",").map(k => `${base} ${k.trim()}`).join(", ");
+        hit = {sel, kind, el};
+      }
+    }
+    if (lab && !hit) {
+      for (const kind of kinds) {
+        const xp = `${labXp}/following::${KIND_XP[kind]}[1]`;
+        const el = xq(xp);
+        if (el) { hit = {sel: `xpath=${xp}`, kind, el}; break; }
+      }
+    }
+    out[label] = hit ? {sel: hit.sel, kind: hit.kind, value: read(hit.el, hit.kind) || ""} : null;
+  }
+  return out;
+}
+"""
+
+# the form layout is fixed, so a context keeps its label map across every record it opens
+_field_maps: "weakref.WeakKeyDictionary[BrowserContext, Dict[str, dict]]" = weakref.WeakKeyDictionary()
+
+def field_map(page: Page) -> Dict[str, dict]:
+    fmap = _field_maps.get(page.context)
+    if fmap is None:
+        fmap = _field_maps[page.context] = {}
+    return fmap
+
+def clean_value(v: Optional[str]) -> str:
+    v = re.sub(r"\s+", " ", v or "").strip()
+    return "" if v in ("<p><br></p>", "&nbsp;") else v
+
+async def snapshot_fields(page: Page, specs: Dict[str, List[str]]) -> Dict[str, Optional[dict]]:
+    """{label: {"sel", "kind", "value"} or None} for every label in `specs`, in one evaluate."""
+    fmap = field_map(page)
+    res = await page.evaluate(SNAPSHOT_JS, [specs, fmap, KIND_CSS])
+    for label, hit in res.items():
+        if hit:
+            fmap[label] = {"sel": hit["sel"], "kind": hit["kind"]}
+        else:
+            fmap.pop(label, None)
+    return res
+
+async def read_fields(page: Page, specs: Dict[str, List[str]]) -> Dict[str, str]:
+    res = await snapshot_fields(page, specs)
+    return {label: clean_value(hit["value"]) if hit else "" for label, hit in res.items()}
+
+async def cached_field(page: Page, label: str, kinds: List[str]) -> Optional[dict]:
+    """Selector + kind for `label`, resolving (and caching) it on first use."""
+    hit = field_map(page).get(label)
+    if hit is None:
+        hit = (await snapshot_fields(page, {label: kinds})).get(label)
+    return hit
+
+async def prime_fields(page: Page, specs: Dict[str, List[str]]):
+    """Resolve every not-yet-cached label in one evaluate before a run of fills."""
+    missing = {l: k for l, k in specs.items() if l not in field_map(page)}
+    if missing:
+        await snapshot_fields(page, missing)
@@ -0,0 +1,109 @@
+import re
+from typing import Dict, Iterable, List
+
+from playwright.async_api import Page
+
+# ---------------------------------------------------------------------
+# asset blocking for worker pages (skip what we never look at, keep the HTTP cache)
+# ---------------------------------------------------------------------
+# Chrome's URL block list (CDP Network.setBlockedURLs) only takes '*' wildcard patterns,
+# so every kind of asset is described by the URLs it's served from.
+KIND_PATTERNS: Dict[str, List[str]] = {
+    "image": ["*.png", "*.png?*", "*.jpg", "*.jpg?*", "*.jpeg", "*.jpeg?*", "*.gif", "*.gif?*", "*.webp", "*.webp?*",
+              "*.svg", "*.svg?*", "*.ico", "*.ico?*", "*/web/image/*", "*/web/image?*", "*/website/image/*"],
+    "font": ["*.woff", "*.woff?*", "*.woff2", "*.woff2?*", "*.ttf", "*.ttf?*", "*.otf", "*.otf?*", "*.eot", "*.eot?*"],
+    "media": ["*.mp4", "*.mp4?*", "*.webm", "*.webm?*", "*.mp3", "*.mp3?*", "*.ogg", "*.ogg?*"],
+    "texttrack": ["*.vtt", "*.vtt?*"],
+    "manifest": ["*.webmanifest", "*/web/manifest.webmanifest*"],
+    "trackers": ["*google-analytics.com/*", "*googletagmanager.com/*", "*fonts.googleapis.com/*",
+                 "*fonts.gstatic.com/*", "*gravatar.com/*"],
+    # the live-notification bus, which form editing doesn't need
+    "bus": ["*/longpolling/*", "*/websocket*", "*/bus/*"],
+}
+
+PROFILES: Dict[str, List[str]] = {
+    "off": [],
+    # stylesheets stay: Odoo hides fields/buttons with CSS and actionability depends on it
+    "lean": ["image", "media", "font", "trackers"],
+    "strict": ["image", "media", "font", "trackers", "texttrack", "manifest", "bus"],
+}
+
+# never blocked, whatever the profile says: the web client's RPC and asset bundles
+ALWAYS_ALLOW = ["/web/dataset/call_kw/product.template/web_read", "/web/webclient/translations/1",
+                "/web/action/load", "/web/session/get_session_info", "/xmlrpc/2/object", "/jsonrpc",
+                "/web/assets/1/web.assets_web.min.js", "/web/assets/1/web.assets_web.min.css"]
+
+def _wildcard_re(pattern: str) -> "re.Pattern":
+    return re.compile(".*".join(re.escape(p) for p in pattern.split("*")) + "$")
+
+class NetFilter:
+    """
+    Blocks asset URLs per page through CDP (Network.setBlockedURLs) instead of routing
+    every request through Playwright: `ctx.route` turns the HTTP cache off for the whole
+    context, this keeps it, so the bundles we do load come from cache on every form after
+    the first. Blocked requests simply fail (the page's error handlers cope).
+    Counts blocked requests by resource type, bytes actually downloaded and responses
+    served from cache.
+    """
+    def __init__(self, profile: str = "lean", extra_kinds: Iterable[str] = (), block_urls: Iterable[str] = ()):
+        kinds = PROFILES.get(profile)
+        if kinds is None:
+            raise ValueError(f"unknown NET_FILTER profile {profile!r} (use one of {', '.join(PROFILES)})")
+        self.profile = profile
+        kinds = list(kinds) + [k.strip() for k in extra_kinds if k.strip() and k.strip() not in kinds]
+        unknown = [k for k in kinds if k not in KIND_PATTERNS]
+        if unknown:
+            raise ValueError(f"unknown NET_BLOCK_TYPES {', '.join(unknown)} (use {', '.join(KIND_PATTERNS)})")
+        self.patterns = [p for k in kinds for p in KIND_PATTERNS[k]] + [u.strip() for u in block_urls if u.strip()]
+        for p in self.patterns:
+            hit = next((u for u in ALWAYS_ALLOW if _wildcard_re(p).match("https://odoo.example.com" + u)), None)
+            if hit:
+                raise ValueError(f"NET_BLOCK_URLS pattern {p!r} would block {hit} (the web client needs it)")
+        self.blocked: Dict[str, int] = {}
+        self.allowed = 0
+        self.from_cache = 0
+        self.bytes_loaded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.patterns)
+
+    async def attach(self, page: Page):
+        """Call on a fresh page before its first navigation."""
+        if not self.enabled:
+            return
+        cdp = await page.context.new_cdp_session(page)
+        cdp.on("Network.loadingFailed", self._failed)
+        cdp.on("Network.loadingFinished", self._finished)
+        cdp.on("Network.requestServedFromCache", self._cached)
+        cdp.on("Network.responseReceived", self._response)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.setBlockedURLs", {"urls": self.patterns})
+
+    def _failed(self, ev: Dict):
+        if ev.get("blockedReason") == "inspector":
+            kind = (ev.get("type") or "Other").lower()
+            self.blocked[kind] = self.blocked.get(kind, 0) + 1
+
+    def _finished(self, ev: Dict):
+        self.allowed += 1
+        self.bytes_loaded += int(ev.get("encodedDataLength") or 0)
+
+    def _cached(self, ev: Dict):
+        self.from_cache += 1  # memory cache
+
+    def _response(self, ev: Dict):
+        if (ev.get("response") or {}).get("fromDiskCache"):
+            self.from_cache += 1
+
+    def as_dict(self) -> Dict:
+        return {"profile": self.profile, "blocked": dict(self.blocked), "allowed": self.allowed,
+                "from_cache": self.from_cache, "bytes_loaded": self.bytes_loaded}
+
+    def summary(self) -> str:
+        if not self.enabled:
+            return "Network filter: off"
+        n = sum(self.blocked.values())
+        by_type = ", ".join(f"{k} {v}" for k, v in sorted(self.blocked.items(), key=lambda kv: -kv[1]))
+        return (f"Network filter ({self.profile}): {n} requests blocked ({by_type or 'none'}), "
+                f"{self.allowed} loaded ({self.from_cache} from HTTP cache, {self.bytes_loaded / 1e6:.1f} MB over the wire)")
@@ -1,11 +1,31 @@
-import asyncio, os, csv, io, json, re, sys, traceback
-from datetime import datetime
-from typing import List, Dict, Optional
+import asyncio, argparse, os, csv, io, itertools, json, re, sys, time, traceback
+from typing import Iterator, List, Dict, Optional, Union
 import requests
 from dotenv import load_dotenv
 from tqdm import tqdm
-from openai import OpenAI
-from playwright.async_api import async_playwright, Page, BrowserContext
+import openai
+from openai import AsyncOpenAI
+from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+from odoo_rpc import OdooRpc, RpcWriter, rpc_base_url
+from seo_cache import ContentCache, cache_key
+from rate_limit import RateLimiter, retry_after_seconds, backoff_delay
+from record_index import RecordIndex
+from form_fields import cached_field, read_fields, prime_fields
+from run_journal import RunJournal, row_key, new_run_id, DONE_STATUSES
+from sync_state import SyncState, row_hash
+from run_metrics import metrics, current_worker
+from adaptive import AimdController, WorkerGate, run_controllers
+from sharding import Shard, parse_shard, shard_of, shard_path, run_shards, merge_shards
+from dead_letter import DeadLetters, DeadLetterStream
+from field_rules import PAYLOAD_KEYS, FieldStats, check_field, check_payload
+from net_filter import NetFilter
+from page_memory import MemoryWatch
+from product_families import ProductFamilies
+import batch_jobs
+from batch_jobs import BatchPayloads, PayloadStream
+from page_waits import (wait_stats, wait_step, wait_idle, wait_logged_in, wait_view_loaded,
+                        wait_form_loaded, wait_form_editable, is_save_response, is_record_read, FORM_READY,
+                        FORM_EDITABLE)
 
 # ── ENV / OPENAI ─────────────────────────────────────────────────────
 load_dotenv()
@@ -13,19 +33,127 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY missing in .env")
-oa = OpenAI(api_key=OPENAI_API_KEY)
+# retries are ours (rate_limit.py) so 429s are shared across every in-flight call
+oa = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
 OD_URL   = os.getenv("OD_URL", "https://greatamerican.steersman.io/web/login")
 OD_EMAIL = os.getenv("OD_EMAIL")
 OD_PASS  = os.getenv("OD_PASS")
 
 HEADLESS = os.getenv("HEADLESS", "false").lower() == "true"
-SLOWMO_MS = int(os.getenv("SLOWMO_MS", "200"))
+SLOWMO_MS = int(os.getenv("SLOWMO_MS", "0"))  # only for watching a headed run; every wait is condition-based
+WAIT_TIMEOUT_MS = int(os.getenv("WAIT_TIMEOUT_MS", "15000"))  # upper bound for each page wait
+# rich-text fields: fast (one paste/insertText, verified) | type (per-character keystrokes)
+FILL_MODE = os.getenv("FILL_MODE", "fast").strip().lower()
 MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "2"))
 BATCH_LIMIT = int(os.getenv("BATCH_LIMIT", "0"))  # 0 = no limit (process all)
+# saved Playwright storage_state (session cookie) reused across contexts and runs
+AUTH_STATE_PATH = os.getenv("AUTH_STATE_PATH", "auth_state.json").strip()
+# asset blocking on worker pages via Chrome's URL block list (HTTP cache stays on): off | lean (images, fonts, media, trackers) | strict (+ notification bus)
+NET_FILTER = os.getenv("NET_FILTER", "lean").strip().lower()
+NET_BLOCK_TYPES = [t for t in os.getenv("NET_BLOCK_TYPES", "").split(",") if t.strip()]  # extra kinds from net_filter.KIND_PATTERNS
+NET_BLOCK_URLS = [u for u in os.getenv("NET_BLOCK_URLS", "").split(",") if u.strip()]  # extra '*' wildcard URL patterns
+# long runs: recycle a worker's page (or whole context) when its memory grows; 0 disables a threshold
+RECYCLE_SCOPE = os.getenv("RECYCLE_SCOPE", "page").strip().lower()  # page (keeps cookies + HTTP cache) | context
+RECYCLE_HEAP_MB = float(os.getenv("RECYCLE_HEAP_MB", "400"))         # page JS heap
+RECYCLE_RENDERER_MB = float(os.getenv("RECYCLE_RENDERER_MB", "1200"))  # largest Chromium renderer RSS
+RECYCLE_EVERY_ITEMS = int(os.getenv("RECYCLE_EVERY_ITEMS", "0"))     # items per page regardless of memory
+MEM_SAMPLE_EVERY = int(os.getenv("MEM_SAMPLE_EVERY", "10"))          # items between memory samples
+MEM_SAMPLES_PATH = os.getenv("MEM_SAMPLES_PATH", "memory_samples.csv").strip()  # per-worker samples ("" = none)
 
 BATCH_CSV_PATH = os.getenv("BATCH_CSV_PATH", "").strip()
 BATCH_CSV_URL  = os.getenv("BATCH_CSV_URL", "").strip()
+RUN_JOURNAL_PATH = os.getenv("RUN_JOURNAL_PATH", "run_journal.sqlite3").strip()
+BATCH_LOG_PATH = os.getenv("BATCH_LOG_PATH", "batch_log.csv").strip()  # exported from the journal
+# incremental sync: skip rows whose content hash matches the last run (full | incremental)
+SYNC_INCREMENTAL = os.getenv("SYNC_MODE", "full").strip().lower() == "incremental"
+SYNC_STATE_PATH = os.getenv("SYNC_STATE_PATH", "sync_state.sqlite3").strip()
+# columns (normalized lowercase headers) that define "changed"; empty = every column
+SYNC_COLUMNS = [c.strip().lower() for c in os.getenv("SYNC_COLUMNS", "").split(",") if c.strip()] or None
+
+# writer backend: browser (Playwright only) | rpc (external API only) | auto (API first, browser for the rest)
+WRITER_BACKEND = os.getenv("WRITER_BACKEND", "browser").strip().lower()
+OD_DB = os.getenv("OD_DB", "").strip()
+OD_RPC_URL = os.getenv("OD_RPC_URL", "").strip() or OD_URL
+OD_MODEL = os.getenv("OD_MODEL", "product.template").strip()
+# optional JSON {"Form Label": "technical_field_name"} for fields whose label != field string
+RPC_FIELD_MAP = json.loads(os.getenv("RPC_FIELD_MAP", "") or "{}")
+# bulk "already filled" scan over the external API before workers start (needs RPC credentials)
+PREFLIGHT_SCAN = os.getenv("PREFLIGHT_SCAN", "true").lower() == "true"
+PREFLIGHT_CHUNK = int(os.getenv("PREFLIGHT_CHUNK", "200"))
+# name/SKU -> record id index so workers open the form URL directly
+RECORD_INDEX = os.getenv("RECORD_INDEX", "true").lower() == "true"
+RECORD_INDEX_PATH = os.getenv("RECORD_INDEX_PATH", "record_index.json").strip()
+RECORD_INDEX_TTL_H = float(os.getenv("RECORD_INDEX_TTL_H", "24"))
+OD_FORM_URL = os.getenv("OD_FORM_URL", "{base}/web#id={id}&model={model}&view_type=form")
+
+GEN_MODEL = os.getenv("GEN_MODEL", "gpt-4o-mini").strip()
+GEN_TEMPERATURE = float(os.getenv("GEN_TEMPERATURE", "0.3"))
+# products per chat request (1 = one request per product, the original behaviour)
+GEN_BATCH_SIZE = max(1, int(os.getenv("GEN_BATCH_SIZE", "1")))
+GEN_BATCH_LINGER_MS = int(os.getenv("GEN_BATCH_LINGER_MS", "250"))
+
+# LLM rate limits (0 = unlimited) + in-flight cap, independent of MAX_CONCURRENT browsers
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))
+GEN_MAX_IN_FLIGHT = int(os.getenv("GEN_MAX_IN_FLIGHT", "16"))
+GEN_MAX_RETRIES = int(os.getenv("GEN_MAX_RETRIES", "6"))
+GEN_EST_OUTPUT_TOKENS = int(os.getenv("GEN_EST_OUTPUT_TOKENS", "700"))  # per product, for TPM budgeting
+# spend accounting (USD per 1M tokens; defaults are gpt-4o-mini list prices) and per-run budgets (0 = none)
+GEN_PRICE_INPUT = float(os.getenv("GEN_PRICE_INPUT", "0.15"))
+GEN_PRICE_CACHED = float(os.getenv("GEN_PRICE_CACHED", "0.075"))
+GEN_PRICE_OUTPUT = float(os.getenv("GEN_PRICE_OUTPUT", "0.60"))
+GEN_TOKEN_BUDGET = int(os.getenv("GEN_TOKEN_BUDGET", "0"))
+GEN_COST_BUDGET_USD = float(os.getenv("GEN_COST_BUDGET_USD", "0"))
+# two-phase offline mode: `generate` (Batch API) writes payloads, `apply` writes them to Odoo
+BATCH_REQUESTS_PATH = os.getenv("BATCH_REQUESTS_PATH", "batch_requests.jsonl").strip()
+BATCH_PAYLOADS_PATH = os.getenv("BATCH_PAYLOADS_PATH", "batch_payloads.jsonl").strip()
+BATCH_POLL_S = float(os.getenv("BATCH_POLL_S", "60"))
+GEN_BATCH_DISCOUNT = float(os.getenv("GEN_BATCH_DISCOUNT", "0.5"))  # Batch API price factor for cost accounting
+# local per-field checks; failing fields (only) are regenerated with a short follow-up prompt
+FIELD_VALIDATION = os.getenv("FIELD_VALIDATION", "true").lower() == "true"
+FIELD_REGEN_ROUNDS = int(os.getenv("FIELD_REGEN_ROUNDS", "2"))
+# product families: near-identical SKUs ("Wix 51515 WIX Air Filter", "Wix 51516 ...") share one generation
+PRODUCT_FAMILIES = os.getenv("PRODUCT_FAMILIES", "false").lower() == "true"
+FAMILY_MIN_SIMILARITY = float(os.getenv("FAMILY_MIN_SIMILARITY", "0.9"))  # masked-name match needed to share
+
+# two-stage pipeline: GEN_CONCURRENCY generators run up to PIPELINE_PREFETCH payloads
+# ahead of the MAX_CONCURRENT browser writers (0 = generate inline in the writer)
+GEN_CONCURRENCY = int(os.getenv("GEN_CONCURRENCY", str(max(8, 2 * GEN_BATCH_SIZE))))
+PIPELINE_PREFETCH = int(os.getenv("PIPELINE_PREFETCH", str(2 * MAX_CONCURRENT)))
+PIPELINE_REPORT_S = float(os.getenv("PIPELINE_REPORT_S", "5"))
+# streaming ingestion: rows are read INGEST_CHUNK at a time into a queue of at most INGEST_QUEUE_MAX
+INGEST_CHUNK = int(os.getenv("INGEST_CHUNK", "200"))
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "500"))
+
+# stage-level retries: a failed item restarts at the failed stage, keeping its payload/record id
+STAGE_MAX_RETRIES = int(os.getenv("STAGE_MAX_RETRIES", "2"))
+STAGE_RETRY_BASE_S = float(os.getenv("STAGE_RETRY_BASE_S", "2"))
+STAGE_RETRY_MAX_S = float(os.getenv("STAGE_RETRY_MAX_S", "30"))
+DEAD_LETTER_PATH = os.getenv("DEAD_LETTER_PATH", "dead_letter.jsonl").strip()  # final failures, re-run with --dead-letter
+RUN_ARTIFACTS_DIR = os.getenv("RUN_ARTIFACTS_DIR", "run_artifacts").strip()  # screenshots of final failures
+
+# adaptive concurrency (AIMD): MAX_CONCURRENT / GEN_MAX_IN_FLIGHT become starting points
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "false").lower() == "true"
+ADAPT_WRITERS_MIN = int(os.getenv("ADAPT_WRITERS_MIN", "1"))
+ADAPT_WRITERS_MAX = int(os.getenv("ADAPT_WRITERS_MAX", str(2 * MAX_CONCURRENT)))
+ADAPT_LLM_MIN = int(os.getenv("ADAPT_LLM_MIN", "2"))
+ADAPT_LLM_MAX = int(os.getenv("ADAPT_LLM_MAX", str(2 * GEN_MAX_IN_FLIGHT)))
+ADAPT_INTERVAL_S = float(os.getenv("ADAPT_INTERVAL_S", "20"))
+ADAPT_WRITE_TARGET_S = float(os.getenv("ADAPT_WRITE_TARGET_S", "30"))  # p90 per-product write time
+ADAPT_LLM_TARGET_S = float(os.getenv("ADAPT_LLM_TARGET_S", "40"))      # p90 per chat completion
+ADAPT_MAX_ERROR_RATE = float(os.getenv("ADAPT_MAX_ERROR_RATE", "0.1"))
+
+# run metrics: stage latency percentiles, per-worker throughput, token usage
+METRICS_JSON_PATH = os.getenv("METRICS_JSON_PATH", "run_metrics.json").strip()
+METRICS_PROM_PATH = os.getenv("METRICS_PROM_PATH", "run_metrics.prom").strip()
+METRICS_SNAPSHOT_S = float(os.getenv("METRICS_SNAPSHOT_S", "0"))  # 0 = only write at the end
+
+# generated-payload cache: on | off (bypass) | refresh (regenerate + overwrite)
+GEN_CACHE = os.getenv("GEN_CACHE", "on").strip().lower()
+GEN_CACHE_PATH = os.getenv("GEN_CACHE_PATH", "seo_cache.sqlite3").strip()
+GEN_CACHE_MAX_ENTRIES = int(os.getenv("GEN_CACHE_MAX_ENTRIES", "50000"))
+GEN_CACHE_MAX_AGE_DAYS = float(os.getenv("GEN_CACHE_MAX_AGE_DAYS", "90"))
 
 # ── HELPERS ──────────────────────────────────────────────────────────
 def sanitize_slug(s: str) -> str:
@@ -35,19 +163,17 @@ def sanitize_slug(s: str) -> str:
     s = re.sub(r"-{2,}", "-", s)
     return s.strip("-")
 
-def gen_override_and_meta_sync(product_name: str) -> dict:
-    prompt = f"""
-Return ONLY valid JSON with keys:
-{{
+PAYLOAD_KEYS_JSON = """{
   "override_preview_description": "",
   "override_summary_description": "",
   "override_full_description": "",
   "website_slug": "",
   "meta_title": "",
   "meta_description": ""
-}}
+}"""
 
-STRICT RULES:
+def prompt_rules(product_name: str) -> str:
+    return f"""STRICT RULES:
 - Identify the product name and NEVER mention or reuse text from other brands or products unless that brand name is part of "{product_name}"
 - for Milwaukee products you can reference the official milwaukee.com site for specs.
 - for other brands/products, keep specs generic if not known or cannot find any website reference.
@@ -73,19 +199,45 @@ STRICT RULES:
 - meta_title: ≤ 60 chars; include brand/model if naturally present in the name.
 - meta_description: ≤ 155 chars; catchy and SEO-friendly.
 - website_slug: SEO-friendly, lowercase, hyphen-separated, no special chars.
-If details are not explicit in the name, keep language generic without inventing specs.
-Only output JSON.
+If details are not explicit in the name, keep language generic without inventing specs."""
+
+# Every prompt is a fixed instruction prefix with the product(s) at the very end, so the
+# provider can reuse its cached prefix across calls. Bump PROMPT_VERSION whenever the
+# prefix text changes: it is part of the payload cache key.
+# Limitation: OpenAI only caches from 1024 identical leading tokens, and the shared part
+# (system message + PROMPT_PREFIX + instruction) is ~520 tokens. A single-product prompt
+# (~510-530 tokens) is below the threshold outright, so GEN_BATCH_SIZE=1 gets no cache hits;
+# batch prompts pass 1024 tokens only from ~40 products, and even then their first 1024
+# tokens include product lines that differ per batch. Expect cached tokens only for repeated
+# identical requests until the rules alone grow past 1024 tokens.
+PROMPT_VERSION = "2"
+
+PROMPT_PREFIX = f"""
+Each product gets one JSON object with keys:
+{PAYLOAD_KEYS_JSON}
+
+"<product name>" in the rules always means that product's own name, exactly as given at the end.
+{prompt_rules("<product name>")}
 """
-    resp = oa.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        response_format={"type":"json_object"},
-        messages=[
-            {"role":"system","content":"You are a precise ecommerce content assistant. Output strict JSON only."},
-            {"role":"user","content":prompt}
-        ],
-    )
-    data = json.loads(resp.choices[0].message.content)
+
+def build_prompt(product_name: str) -> str:
+    return f"""{PROMPT_PREFIX}
+Return ONLY valid JSON: the object for the product below. Only output JSON.
+
+PRODUCT: {product_name}
+"""
+
+def build_batch_prompt(names_by_id: Dict[str, str]) -> str:
+    listing = "\n".join(f"- {pid}: {name}" for pid, name in names_by_id.items())
+    return f"""{PROMPT_PREFIX}
+Return ONLY valid JSON: one object whose keys are EXACTLY the product ids listed under PRODUCTS,
+each mapped to that product's object. Apply the rules to EACH product independently. Only output JSON.
+
+PRODUCTS (id: product name):
+{listing}
+"""
+
+def apply_guardrails(data: dict, product_name: str) -> dict:
     mt = (data.get("meta_title") or "").strip()
     md = (data.get("meta_description") or "").strip()
     if len(mt) > 60: mt = mt[:60].rstrip()
@@ -97,8 +249,272 @@ Only output JSON.
         if data.get(k): data[k] = data[k].strip()
     return data
 
+metrics.prices = {"input": GEN_PRICE_INPUT, "cached": GEN_PRICE_CACHED, "output": GEN_PRICE_OUTPUT}
+budget_stop: Optional[str] = None  # why generation stopped early, once a budget is used up
+
+def budget_exceeded() -> bool:
+    """True once the run's token or cost budget is spent; calls already in flight still finish."""
+    global budget_stop
+    if budget_stop is None:
+        spent, cost = metrics.tokens["total"], metrics.cost_usd()
+        if GEN_TOKEN_BUDGET and spent >= GEN_TOKEN_BUDGET:
+            budget_stop = f"token budget reached ({spent} / {GEN_TOKEN_BUDGET} tokens)"
+        elif GEN_COST_BUDGET_USD and cost >= GEN_COST_BUDGET_USD:
+            budget_stop = f"cost budget reached (${cost:.4f} / ${GEN_COST_BUDGET_USD:.4f})"
+        if budget_stop:
+            print(f"[budget] {budget_stop}: no new products are generated; finish later with --resume")
+    return budget_stop is not None
+
+_limiter: Optional[RateLimiter] = None
+llm_control: Optional[AimdController] = None  # set by run_pipeline when ADAPTIVE_CONCURRENCY is on
+
+def llm_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(OPENAI_RPM, OPENAI_TPM, GEN_MAX_IN_FLIGHT)
+    return _limiter
+
+def estimate_tokens(prompt: str, products: int = 1) -> int:
+    # ~4 chars/token for the prompt plus the expected completion size
+    return len(prompt) // 4 + GEN_EST_OUTPUT_TOKENS * products
+
+def chat_request(prompt: str) -> dict:
+    """Chat completion parameters, shared by live calls and Batch API request lines."""
+    return {
+        "model": GEN_MODEL,
+        "temperature": GEN_TEMPERATURE,
+        "response_format": {"type":"json_object"},
+        "messages": [
+            {"role":"system","content":"You are a precise ecommerce content assistant. Output strict JSON only."},
+            {"role":"user","content":prompt}
+        ],
+    }
+
+async def _chat_json(prompt: str, product_names: List[str]) -> dict:
+    """
+    One chat completion through the shared limiter. 429s / 5xx / timeouts back off
+    (honouring retry-after hints) and pause every other caller as well on a 429.
+    Token usage is attributed to `product_names` in the run metrics.
+    """
+    limiter = llm_limiter()
+    est = estimate_tokens(prompt, len(product_names))
+    for attempt in range(GEN_MAX_RETRIES + 1):
+        t0 = None
+        try:
+            async with limiter.slot(est):
+                with metrics.time("llm_call"):
+                    t0 = time.monotonic()
+                    if llm_control is not None:
+                        llm_control.note_load(limiter.in_flight)
+                    resp = await oa.chat.completions.create(**chat_request(prompt))
+            limiter.settle(est, metrics.add_usage(product_names, resp.usage))
+            if llm_control is not None:
+                llm_control.observe(time.monotonic() - t0)
+            return json.loads(resp.choices[0].message.content)
+        except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+            if llm_control is not None and t0 is not None:
+                llm_control.observe(time.monotonic() - t0, ok=False, throttled=isinstance(e, openai.RateLimitError))
+            if attempt >= GEN_MAX_RETRIES:
+                raise
+            resp_obj = getattr(e, "response", None)
+            delay = retry_after_seconds(resp_obj.headers if resp_obj is not None else None)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            if isinstance(e, openai.RateLimitError):
+                limiter.pause(delay)
+            await asyncio.sleep(delay)
+
+async def gen_override_and_meta_one(product_name: str) -> dict:
+    return await _chat_json(build_prompt(product_name), [product_name])
+
+async def gen_override_and_meta_batch(product_names: List[str]) -> Dict[str, Union[dict, Exception]]:
+    """
+    One request for several products; the model answers with {id: payload}.
+    Anything the batch didn't return (or returned malformed) is regenerated on its own;
+    a product whose own retry fails maps to that exception, its batchmates keep their payloads.
+    """
+    names = list(dict.fromkeys(product_names))
+    if len(names) == 1:
+        return {names[0]: await gen_override_and_meta_one(names[0])}
+    names_by_id = {f"p{i + 1}": n for i, n in enumerate(names)}
+    try:
+        raw = await _chat_json(build_batch_prompt(names_by_id), names)
+    except Exception as e:
+        print(f"[gen] batch of {len(names)} failed ({type(e).__name__}: {e}); retrying one by one")
+        raw = {}
+    out: Dict[str, dict] = {}
+    for pid, name in names_by_id.items():
+        d = raw.get(pid) if isinstance(raw, dict) else None
+        if isinstance(d, dict) and d.get("override_full_description"):
+            out[name] = d
+    missing = [n for n in names if n not in out]
+    if missing and len(missing) < len(names):
+        print(f"[gen] batch missed {len(missing)}/{len(names)} products; retrying them individually")
+    singles = await asyncio.gather(*(gen_override_and_meta_one(n) for n in missing), return_exceptions=True)
+    out.update(zip(missing, singles))
+    return out
+
+class GenBatcher:
+    """
+    Coalesces concurrent gen_override_and_meta() calls into batches of up to `size`
+    products, flushing early after `linger` seconds so a lone caller isn't held back.
+    """
+    def __init__(self, size: int, linger: float):
+        self.size = size
+        self.linger = linger
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def generate(self, product_name: str) -> dict:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((product_name, fut))
+        if len(self._pending) >= self.size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.linger, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch: List[tuple]):
+        try:
+            results = await gen_override_and_meta_batch([n for n, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done(): fut.set_exception(e)
+            return
+        for name, fut in batch:
+            if fut.done():
+                continue
+            r = results[name]
+            if isinstance(r, BaseException):
+                fut.set_exception(r)
+            else:
+                fut.set_result(dict(r))
+
+_gen_batcher: Optional[GenBatcher] = None
+content_cache: Optional[ContentCache] = None  # opened by main_async
+
+def payload_cache_key(product_name: str) -> str:
+    # the template with a placeholder name stands in for the prompt version
+    return cache_key(product_name, GEN_MODEL, GEN_TEMPERATURE, f"v{PROMPT_VERSION}\n{build_prompt('<product name>')}")
+
+def field_rules_text(keys: List[str]) -> str:
+    """The general rules plus only the per-field rules for `keys`, cut from prompt_rules()."""
+    key_line = re.compile(r"^- (%s):" % "|".join(PAYLOAD_KEYS))
+    head: List[str] = []
+    blocks: Dict[str, List[str]] = {}
+    tail: List[str] = []
+    cur = None
+    for line in prompt_rules("<product name>").splitlines():
+        m = key_line.match(line)
+        if m:
+            cur = m.group(1)
+            blocks[cur] = [line]
+        elif line.startswith("If details are not explicit"):
+            cur = None
+            tail.append(line)
+        elif cur:
+            blocks[cur].append(line)
+        else:
+            head.append(line)
+    return "\n".join(head + [l for k in keys for l in blocks.get(k, [])] + tail)
+
+def build_field_prompt(product_name: str, problems: Dict[str, List[str]], data: dict) -> str:
+    keys = list(problems)
+    listing = "\n".join(f"- {k}: {'; '.join(p)}\n  previous value: {json.dumps(data.get(k) or '', ensure_ascii=False)}"
+                        for k, p in problems.items())
+    return f"""
+"<product name>" in the rules always means the product named at the end.
+{field_rules_text(keys)}
+
+Return ONLY valid JSON with keys:
+{json.dumps({k: "" for k in keys}, indent=2)}
+Only output JSON.
+
+Rewrite only these fields for the product below; the previous values broke the rules:
+{listing}
+
+PRODUCT: {product_name}
+"""
+
+field_stats = FieldStats()
+metrics.extra["field_validation"] = field_stats.fields
+
+async def validate_payload(product_name: str, data: dict) -> dict:
+    """
+    Check every field locally; only the failing ones are regenerated, all in one small
+    follow-up call per round. The slug is always fixed locally by apply_guardrails.
+    """
+    if not FIELD_VALIDATION:
+        return data
+    problems = check_payload(data, product_name)
+    field_stats.first_check(PAYLOAD_KEYS, problems)
+    problems.pop("website_slug", None)
+    for _ in range(FIELD_REGEN_ROUNDS):
+        if not problems:
+            break
+        for k in problems:
+            field_stats.count(k, "regenerated")
+        try:
+            fixed = await _chat_json(build_field_prompt(product_name, problems, data), [product_name])
+        except Exception as e:
+            print(f"[gen] field regeneration for {product_name} failed ({type(e).__name__}: {e})")
+            break
+        for k, old in problems.items():
+            v = fixed.get(k) if isinstance(fixed, dict) else None
+            if not isinstance(v, str) or not v.strip():
+                continue
+            new = check_field(k, v, product_name)
+            if not new:
+                field_stats.count(k, "repaired")
+            if len(new) < len(old):
+                data[k] = v
+        problems = {k: p for k in problems if (p := check_field(k, data.get(k), product_name))}
+    for k, p in problems.items():
+        field_stats.count(k, "unresolved")
+        print(f"[gen] {product_name}: {k} still fails validation ({'; '.join(p)})")
+    return data
+
+CACHE_VALIDATED = "_validated"  # stored next to a cached payload, never handed to the writers
+
+async def _gen_payload(product_name: str) -> dict:
+    global _gen_batcher
+    key = data = None
+    if content_cache is not None:
+        key = payload_cache_key(product_name)
+        data = content_cache.get(key)
+        # entries that already went through validate_payload come back as they are, even
+        # with fields it couldn't fix; older / unvalidated ones that fail are repaired once below
+        if data is not None and (data.pop(CACHE_VALIDATED, False) or not (FIELD_VALIDATION and check_payload(data, product_name))):
+            return data
+    if data is None:
+        if GEN_BATCH_SIZE > 1:
+            if _gen_batcher is None:
+                _gen_batcher = GenBatcher(GEN_BATCH_SIZE, GEN_BATCH_LINGER_MS / 1000)
+            data = await _gen_batcher.generate(product_name)
+        else:
+            data = await gen_override_and_meta_one(product_name)
+    data = apply_guardrails(await validate_payload(product_name, data), product_name)
+    if key is not None:
+        content_cache.put(key, product_name, {**data, CACHE_VALIDATED: FIELD_VALIDATION})
+    return data
+
+families: Optional[ProductFamilies] = ProductFamilies(FAMILY_MIN_SIMILARITY) if PRODUCT_FAMILIES else None
+if families is not None:
+    metrics.extra["product_families"] = families.as_dict
+
+@metrics.timed("generate")
 async def gen_override_and_meta(product_name: str) -> dict:
-    return await asyncio.to_thread(gen_override_and_meta_sync, product_name)
+    if families is None:
+        return await _gen_payload(product_name)
+    return apply_guardrails(await families.generate(product_name, _gen_payload), product_name)
 
 # ---------------------------------------------------------------------
 # DOM helpers
@@ -111,8 +527,24 @@ async def clear_input_or_textarea(page: Page, el):
     except:
         pass
 
+async def _cached_field(page: Page, label_text: str, kinds: List[str]) -> Optional[dict]:
+    try:
+        return await cached_field(page, label_text, kinds)
+    except:
+        return None
+
 async def fill_input_or_textarea_by_exact_label(page: Page, label_text: str, value: Optional[str]) -> bool:
     if not value: return False
+    hit = await _cached_field(page, label_text, ["input", "textarea"])
+    if hit:
+        try:
+            el = page.locator(hit["sel"]).first
+            await el.scroll_into_view_if_needed()
+            await clear_input_or_textarea(page, el)
+            await el.fill(value)
+            return True
+        except:
+            pass
     try:
         el = page.locator(f"//label[normalize-space(.)={json.dumps(label_text)}]/following::input[1]").first
         await el.scroll_into_view_if_needed()
@@ -130,24 +562,83 @@ async def fill_input_or_textarea_by_exact_label(page: Page, label_text: str, val
     except:
         return False
 
+# Replace the editor content in one go: a synthetic paste (what Odoo's editor handles
+# for Cmd+V) and execCommand insertText as the fallback, then input/change so the
+# field is marked dirty. fast_fill_rich reads the text back to verify.
+FAST_FILL_JS = """
+(el, value) => {
+  el.focus();
+  const range = document.createRange();
+  range.selectNodeContents(el);
+  const sel = window.getSelection();
+  sel.removeAllRanges(); sel.addRange(range);
+  let handled = false;
+  try {
+    const dt = new DataTransfer();
+    dt.setData('text/plain', value);
+    const ev = new ClipboardEvent('paste', {clipboardData: dt, bubbles: true, cancelable: true});
+    el.dispatchEvent(ev);
+    handled = ev.defaultPrevented;
+  } catch (e) {}
+  if (!handled) document.execCommand('insertText', false, value);
+  el.dispatchEvent(new Event('input', {bubbles: true}));
+  el.dispatchEvent(new Event('change', {bubbles: true}));
+}
+"""
+
+CLEAR_RICH_JS = """
+el => {
+  el.focus();
+  const range = document.createRange();
+  range.selectNodeContents(el);
+  const sel = window.getSelection();
+  sel.removeAllRanges(); sel.addRange(range);
+  document.execCommand('delete');
+}
+"""
+
+fill_stats = {"fast": 0, "typed": 0}
+
+def _squash(v: str) -> str:
+    return re.sub(r"\s+", " ", v or "").strip()
+
+async def fast_fill_rich(rich, value: str) -> bool:
+    try:
+        await rich.evaluate(FAST_FILL_JS, value)
+        return _squash(await rich.inner_text()) == _squash(value)
+    except:
+        return False
+
 async def fill_rich_or_textarea_by_exact_label(page: Page, label_text: str, value: Optional[str]) -> bool:
     if not value: return False
-    try:
-        rich = page.locator(
-            f"//label[normalize-space(.)={json.dumps(label_text)}]"
-            f"/following::*[self::div[@contenteditable='true'] or contains(@class,'note-editable')][1]"
-        ).first
-        await rich.scroll_into_view_if_needed()
-        await rich.click()
+    hit = await _cached_field(page, label_text, ["rich", "textarea"])
+    if not hit or hit["kind"] == "rich":
         try:
-            await page.keyboard.press("Meta+a"); await page.keyboard.press("Backspace")
-        except: pass
-        await rich.type(value, delay=1)
-        return True
-    except:
-        pass
+            rich = page.locator(
+                hit["sel"] if hit else
+                f"//label[normalize-space(.)={json.dumps(label_text)}]"
+                f"/following::*[self::div[@contenteditable='true'] or contains(@class,'note-editable')][1]"
+            ).first
+            await rich.scroll_into_view_if_needed()
+            await rich.click()
+            if FILL_MODE == "fast":
+                if await fast_fill_rich(rich, value):
+                    fill_stats["fast"] += 1
+                    return True
+                try:
+                    await rich.evaluate(CLEAR_RICH_JS)  # drop whatever the failed fast fill left behind
+                except: pass
+            try:
+                await page.keyboard.press("Meta+a"); await page.keyboard.press("Backspace")
+            except: pass
+            await rich.type(value, delay=1)
+            fill_stats["typed"] += 1
+            return True
+        except:
+            pass
     try:
         ta = page.locator(
+            hit["sel"] if hit and hit["kind"] == "textarea" else
             f"//label[normalize-space(.)={json.dumps(label_text)}]/following::textarea[1]"
         ).first
         await ta.scroll_into_view_if_needed()
@@ -171,228 +662,1150 @@ async def get_text_by_exact_label(page: Page, label_text: str) -> str:
             pass
     return ""
 
-async def is_all_fields_filled(page: Page) -> bool:
-    fields = [
-        "Override Preview Description",
-        "Override Summary Description",
-        "Override Full Description",
-        "Meta Title",
-        "Meta Description",
-    ]
-    for f in fields:
-        v = await get_text_by_exact_label(page, f)
-        if not v:
-            return False
-    return True
+# labels checked to decide whether a product is already done
+FILLED_CHECK_LABELS = [
+    "Override Preview Description",
+    "Override Summary Description",
+    "Override Full Description",
+    "Meta Title",
+    "Meta Description",
+]
+
+# payload key -> (form label, editor kind, fallback label)
+PAYLOAD_FIELDS = [
+    ("override_preview_description", "Override Preview Description", "rich", None),
+    ("override_summary_description", "Override Summary Description", "rich", None),
+    ("override_full_description", "Override Full Description", "rich", None),
+    ("website_slug", "Website Slug", "input", "Website URL"),
+    ("meta_title", "Meta Title", "input", None),
+    ("meta_description", "Meta Description", "input", None),
+]
+
+def payload_by_label(data: dict) -> Dict[str, str]:
+    return {label: data.get(key) for key, label, _, _ in PAYLOAD_FIELDS if data.get(key)}
+
+# editor kinds to look for under each label, in preference order (same as the fill helpers)
+FIELD_KINDS = {label: (["rich", "textarea"] if kind == "rich" else ["input", "textarea"])
+               for _, label, kind, _ in PAYLOAD_FIELDS}
+
+@metrics.timed("check_filled")
+async def is_all_fields_filled(page: Page, labels: Optional[List[str]] = None) -> bool:
+    labels = labels if labels is not None else FILLED_CHECK_LABELS
+    try:
+        values = await read_fields(page, {l: FIELD_KINDS.get(l, ["input", "textarea", "rich"]) for l in labels})
+    except:
+        # evaluate failed (navigation in flight?) - fall back to one probe per label
+        values = {l: await get_text_by_exact_label(page, l) for l in labels}
+    return all(values.get(l) for l in labels)
+
+async def fill_payload(page: Page, data: dict, only_labels: Optional[List[str]] = None):
+    try:
+        specs = dict(FIELD_KINDS)
+        specs.update({alt: ["input", "textarea"] for _, _, _, alt in PAYLOAD_FIELDS if alt})
+        await prime_fields(page, specs)
+    except:
+        pass
+    for key, label, kind, alt in PAYLOAD_FIELDS:
+        if only_labels is not None and label not in only_labels:
+            continue
+        value = data.get(key)
+        with metrics.time(f"fill:{key}"):
+            if kind == "rich":
+                await fill_rich_or_textarea_by_exact_label(page, label, value)
+            elif not await fill_input_or_textarea_by_exact_label(page, label, value) and alt:
+                await fill_input_or_textarea_by_exact_label(page, alt, value)
 
 # ---------------------------------------------------------------------
 # login + navigation
 # ---------------------------------------------------------------------
-async def login_and_open_context(p, headless: bool, slow_mo: int):
-    browser = await p.chromium.launch(headless=headless, slow_mo=slow_mo)
-    ctx = await browser.new_context()
-    page = await ctx.new_page()
+def is_login_page(page: Page) -> bool:
+    return "/web/login" in (page.url or "")
+
+@metrics.timed("login")
+async def login(page: Page):
     await page.goto(OD_URL, timeout=60_000)
     await page.fill("input[name='login'], input[name='email']", OD_EMAIL)
     await page.fill("input[name='password']", OD_PASS)
     await page.click("button[type='submit']")
-    await page.wait_for_timeout(3000)
-    return ctx, page
+    await wait_logged_in(page, WAIT_TIMEOUT_MS)
 
+class BrowserSession:
+    """
+    One Chromium for the whole run; each worker gets its own context built from a
+    saved storage_state, so we log in once (per run, or less while the cookie lives)
+    and only go through the login form again when Odoo bounces us to /web/login.
+    """
+    def __init__(self, browser: Browser, state_path: str, net_filter: Optional[NetFilter] = None):
+        self.browser = browser
+        self.state_path = state_path
+        self.net_filter = net_filter
+        self.home_url = rpc_base_url(OD_URL) + "/web"
+        self.logins = 0
+        self._login_lock = asyncio.Lock()
+        self._state_version = 0
+
+    @classmethod
+    async def start(cls, p, headless: bool, slow_mo: int, state_path: str,
+                    net_filter: Optional[NetFilter] = None) -> "BrowserSession":
+        browser = await p.chromium.launch(headless=headless, slow_mo=slow_mo)
+        session = cls(browser, state_path, net_filter)
+        ctx, page = await session.open_page()  # validates (or creates) the saved login
+        await ctx.close()
+        return session
+
+    async def _new_context(self) -> BrowserContext:
+        if os.path.exists(self.state_path):
+            ctx = await self.browser.new_context(storage_state=self.state_path)
+        else:
+            ctx = await self.browser.new_context()
+        ctx.set_default_timeout(WAIT_TIMEOUT_MS)  # every click/fill without its own timeout, not Playwright's 30 s
+        return ctx
+
+    async def _new_page(self, ctx: BrowserContext) -> Page:
+        page = await ctx.new_page()
+        if self.net_filter is not None:
+            await self.net_filter.attach(page)
+        return page
+
+    async def _open_home(self, page: Page):
+        await page.goto(self.home_url, timeout=60_000)
+        if is_login_page(page):
+            await self.relogin(page)
+
+    async def open_page(self):
+        ctx = await self._new_context()
+        page = await self._new_page(ctx)
+        await self._open_home(page)
+        return ctx, page
+
+    async def recycle(self, ctx: BrowserContext, page: Page, scope: str = "page"):
+        """
+        Swap a worker's page for a fresh one: scope "page" keeps the context (cookies and
+        HTTP cache, so no asset re-download; the NetFilter blocks per page and never routes
+        the context, which would turn that cache off); "context" rebuilds it from the saved login.
+        """
+        if scope == "context":
+            await ctx.close()
+            return await self.open_page()
+        fresh = await self._new_page(ctx)
+        await page.close()
+        await self._open_home(fresh)
+        return ctx, fresh
+
+    async def discard(self, ctx: Optional[BrowserContext]):
+        """Close a worker's context that may already be half gone (crashed page, closed browser)."""
+        if ctx is None:
+            return
+        try:
+            await ctx.close()
+        except Exception as e:
+            print(f"[⚠] closing context failed: {type(e).__name__}: {e}")
+
+    async def relogin(self, page: Page):
+        """Log in on `page` and re-save the state; concurrent callers wait for one login."""
+        seen = self._state_version
+        async with self._login_lock:
+            if self._state_version != seen and os.path.exists(self.state_path):
+                # someone else already refreshed the session; pick up their cookies
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    await page.context.add_cookies(json.load(f).get("cookies", []))
+                await page.goto(self.home_url, timeout=60_000)
+                if not is_login_page(page):
+                    return
+            await login(page)
+            self.logins += 1
+            await page.context.storage_state(path=self.state_path)
+            self._state_version += 1
+
+    async def close(self):
+        await self.browser.close()
+
+@metrics.timed("goto_pim")
 async def goto_pim(page: Page):
     for _ in range(3):
         try:
-            await page.get_by_text("PIM", exact=False).first.click(); break
+            await page.get_by_text("PIM", exact=False).first.click(timeout=WAIT_TIMEOUT_MS); break
         except:
             try:
-                await page.locator(".o_app .o_caption:has-text('PIM'), .o_app:has-text('PIM')").first.click(); break
+                await page.locator(".o_app .o_caption:has-text('PIM'), .o_app:has-text('PIM')").first.click(timeout=WAIT_TIMEOUT_MS); break
             except:
                 try:
                     await page.locator(".o_menu_apps, .o_app_switcher").first.click()
+                    await wait_step("app_menu", page.locator(".o_app").first.wait_for(timeout=WAIT_TIMEOUT_MS))
                 except:
                     pass
-        await page.wait_for_timeout(600)
-    await page.wait_for_timeout(1200)
+    await wait_view_loaded(page, WAIT_TIMEOUT_MS)
 
+@metrics.timed("search_open")
 async def search_and_open_product(page: Page, product_name: str) -> bool:
     try:
         s = page.locator("input.o_searchview_input, input[placeholder='Search...']").first
         await s.click(); await s.fill(product_name); await s.press("Enter")
     except:
         pass
+    await wait_idle(page, "search_idle", WAIT_TIMEOUT_MS)
     try:
         await page.locator(".o_kanban_record", has_text=product_name).first.click()
-        return True
     except:
         try:
             await page.get_by_text(product_name, exact=False).first.click()
-            return True
         except:
             return False
+    await wait_form_loaded(page, WAIT_TIMEOUT_MS)
+    return True
+
+@metrics.timed("direct_open")
+async def open_record_form(page: Page, record_id: int) -> bool:
+    url = OD_FORM_URL.format(base=rpc_base_url(OD_URL), id=record_id, model=OD_MODEL)
+    # from the form a worker just saved, /web#id=... is a same-document navigation: goto
+    # returns at once with the previous record still on screen, so wait for this record's read
+    same_doc = "#" in url and page.url != url and page.url.split("#", 1)[0] == url.split("#", 1)[0]
+    try:
+        if page.url == url:
+            await page.reload(timeout=60_000)  # retrying the same record: nothing would navigate
+        elif same_doc:
+            old = await page.query_selector(FORM_READY)
+            async with page.expect_response(is_record_read(record_id), timeout=WAIT_TIMEOUT_MS) as resp:
+                await page.goto(url, timeout=60_000)
+            await resp.value
+            if old is not None:
+                await wait_step("form_swap", page.wait_for_function("el => !el.isConnected", arg=old, timeout=2000))
+        else:
+            await page.goto(url, timeout=60_000)
+    except:
+        return False
+    return await wait_form_loaded(page, WAIT_TIMEOUT_MS)
+
+async def open_product(page: Page, product_name: str, sku: Optional[str]) -> bool:
+    """Direct form URL when the index knows the record, PIM kanban search otherwise."""
+    if is_login_page(page) and browser_session is not None:
+        await browser_session.relogin(page)
+    rid = record_index.lookup(product_name, sku) if record_index is not None else None
+    if rid is not None:
+        if await open_record_form(page, rid):
+            return True
+        if is_login_page(page) and browser_session is not None:
+            # session expired under us: log in again and retry the direct open once
+            await browser_session.relogin(page)
+            if await open_record_form(page, rid):
+                return True
+    await goto_pim(page)
+    return await search_and_open_product(page, product_name)
 
+@metrics.timed("website_edit")
 async def open_website_edit(page: Page):
     try:
-        await page.get_by_role("tab", name="Website").click()
+        await page.get_by_role("tab", name="Website").click(timeout=WAIT_TIMEOUT_MS)
     except:
         try:
-            await page.locator("a[role='tab']:has-text('Website'), .nav-link:has-text('Website')").first.click()
+            await page.locator("a[role='tab']:has-text('Website'), .nav-link:has-text('Website')").first.click(
+                timeout=WAIT_TIMEOUT_MS)
         except:
             pass
+    # Odoo 16+ forms are always editable and have no Edit button: don't wait for one
+    if await page.locator(FORM_EDITABLE).count():
+        return
     try:
-        await page.get_by_role("button", name="Edit").click()
+        await page.get_by_role("button", name="Edit").click(timeout=WAIT_TIMEOUT_MS)
     except:
         try:
-            await page.locator("button.o_form_button_edit, button:has-text('Edit')").first.click()
+            await page.locator("button.o_form_button_edit, button:has-text('Edit')").first.click(timeout=WAIT_TIMEOUT_MS)
         except:
             pass
-    await page.wait_for_timeout(600)
+    await wait_form_editable(page, WAIT_TIMEOUT_MS)
 
-async def save_form(page: Page):
-    try:
-        await page.get_by_role("button", name="Save").click()
-    except:
+@metrics.timed("save")
+async def save_form(page: Page) -> bool:
+    """Click Save and wait for the save RPC to come back rather than sleeping."""
+    async def click_save():
         try:
-            await page.locator("button.o_form_button_save, button:has-text('Save')").first.click()
+            await page.get_by_role("button", name="Save").click(timeout=WAIT_TIMEOUT_MS)
         except:
-            pass
-    await page.wait_for_timeout(1200)
+            try:
+                await page.locator("button.o_form_button_save, button:has-text('Save')").first.click(timeout=WAIT_TIMEOUT_MS)
+            except:
+                pass
+
+    async def saved():
+        async with page.expect_response(is_save_response, timeout=WAIT_TIMEOUT_MS) as resp:
+            await click_save()
+        await resp.value
+
+    ok = await wait_step("save", saved())
+    return ok and await wait_idle(page, "save_idle", WAIT_TIMEOUT_MS)
 
 # ---------------------------------------------------------------------
 # product processing
 # ---------------------------------------------------------------------
-async def process_one(page: Page, product_name: str, sku: Optional[str]) -> str:
-    await goto_pim(page)
-    found = await search_and_open_product(page, product_name)
-    if not found:
+record_index: Optional[RecordIndex] = None  # loaded by main_async
+browser_session: Optional[BrowserSession] = None  # started by main_async unless WRITER_BACKEND=rpc
+memory_watch: Optional[MemoryWatch] = None  # started with the browser session
+
+def load_record_index(writer: RpcWriter) -> Optional[RecordIndex]:
+    idx = RecordIndex.load(RECORD_INDEX_PATH, RECORD_INDEX_TTL_H * 3600)
+    if idx is not None:
+        print(f"Record index: loaded {len(idx)} products from {RECORD_INDEX_PATH}")
+        return idx
+    try:
+        idx = RecordIndex.build(writer.rpc, writer.model)
+    except Exception as e:
+        print(f"Record index unavailable ({type(e).__name__}: {e}); using PIM search.")
+        return None
+    try:
+        idx.save(RECORD_INDEX_PATH)
+    except OSError as e:
+        print(f"Record index: built {len(idx)} products (not saved: {e})")
+        return idx
+    print(f"Record index: built {len(idx)} products -> {RECORD_INDEX_PATH}")
+    return idx
+
+def make_rpc_writer(force: bool = False) -> Optional[RpcWriter]:
+    if not force and WRITER_BACKEND not in ("rpc", "auto"):
+        return None
+    rpc = OdooRpc(OD_RPC_URL, OD_DB, OD_EMAIL, OD_PASS)
+    return RpcWriter(rpc, OD_MODEL, RPC_FIELD_MAP)
+
+async def preflight_scan(rows: List[Dict[str, str]], writer: RpcWriter) -> Optional[List[Dict[str, str]]]:
+    """
+    Bulk "already filled" check over the external API for one ingestion chunk.
+    Complete rows are logged as skipped and dropped; anything the scan can't
+    resolve stays in the queue for the normal per-product check.
+    Returns None when the scan itself is unavailable.
+    """
+    keys = [(r["Product Name"], r.get("SKU") or None) for r in rows]
+    try:
+        with metrics.time("preflight"):
+            status = await asyncio.to_thread(writer.bulk_filled, keys, FILLED_CHECK_LABELS, PREFLIGHT_CHUNK)
+    except Exception as e:
+        print(f"Pre-flight scan unavailable ({type(e).__name__}: {e}); checking per product instead.")
+        return None
+    remaining = []
+    for r, key in zip(rows, keys):
+        if status.get(key):
+            append_log(r["Product Name"], r.get("SKU", ""), "skipped", "preflight: all fields filled")
+            metrics.item_done("skipped")
+        else:
+            if key in status:
+                r["Unfilled"] = True  # known to need content: safe to generate ahead of the writer
+            remaining.append(r)
+    return remaining
+
+class ItemState:
+    """
+    How far one product got. It survives retries, so a retry starts at the failed
+    stage without generating the payload or resolving the record a second time,
+    and it is what a final failure leaves in the dead-letter file.
+    """
+    def __init__(self, row: Dict, data: Optional[dict] = None):
+        self.row = row
+        self.name = row["Product Name"]
+        self.sku = row.get("SKU", "")
+        self.data = data if data is not None else row.get("Payload")
+        self.record_id: Optional[int] = row.get("Record Id")
+        self.checked = False  # "already filled?" answered (no) - not asked again on a retry
+        self.stage = "queued"
+        self.attempts = 0
+
+    def enter(self, stage: str):
+        self.stage = stage
+        log_stage(self.name, self.sku, stage)
+
+    def dead_letter(self, error: str, screenshot: str = "") -> dict:
+        return {"Product Name": self.name, "SKU": self.sku, "Row Hash": self.row.get("Row Hash", ""),
+                "stage": self.stage, "attempts": self.attempts, "error": error, "screenshot": screenshot,
+                "record_id": self.record_id, "payload": self.data}
+
+async def ensure_payload(state: ItemState):
+    if state.data is None:
+        state.enter("generate")
+        state.data = await gen_override_and_meta(state.name)
+
+async def process_one_browser(page: Page, state: ItemState, only_labels: Optional[List[str]] = None) -> str:
+    state.enter("open")
+    if not await open_product(page, state.name, state.sku):
         return "not_found"
     await open_website_edit(page)
-    if await is_all_fields_filled(page):
-        return "skipped"
-    data = await gen_override_and_meta(product_name)
-    await fill_rich_or_textarea_by_exact_label(page, "Override Preview Description", data.get("override_preview_description"))
-    await fill_rich_or_textarea_by_exact_label(page, "Override Summary Description", data.get("override_summary_description"))
-    await fill_rich_or_textarea_by_exact_label(page, "Override Full Description", data.get("override_full_description"))
-    slug_val = data.get("website_slug")
-    ok_slug = await fill_input_or_textarea_by_exact_label(page, "Website Slug", slug_val)
-    if not ok_slug:
-        await fill_input_or_textarea_by_exact_label(page, "Website URL", slug_val)
-    await fill_input_or_textarea_by_exact_label(page, "Meta Title", data.get("meta_title"))
-    await fill_input_or_textarea_by_exact_label(page, "Meta Description", data.get("meta_description"))
-    await save_form(page)
+    if not state.checked:
+        state.enter("check")
+        if await is_all_fields_filled(page):
+            return "skipped"
+        state.checked = True
+    await ensure_payload(state)
+    state.enter("fill")
+    await fill_payload(page, state.data, only_labels)
+    state.enter("save")
+    if not await save_form(page):
+        raise RuntimeError(f"save not confirmed within {WAIT_TIMEOUT_MS} ms")
+    return "updated"
+
+async def process_one_rpc(page: Optional[Page], writer: RpcWriter, state: ItemState) -> Optional[str]:
+    """
+    Resolve + check + write over the external API. Labels the API can't reach are
+    handed to the browser (when a page is available). Returns None to ask the caller
+    to run the plain browser path instead (record not resolvable over RPC).
+    """
+    if state.record_id is None:
+        state.enter("resolve")
+        rid = record_index.lookup(state.name, state.sku) if record_index is not None else None
+        if rid is None:
+            with metrics.time("rpc_find"):
+                rid = await asyncio.to_thread(writer.find_product, state.name, state.sku)
+        if rid is None:
+            return "not_found" if page is None else None
+        state.record_id = rid
+    rid = state.record_id
+
+    if not state.checked:
+        state.enter("check")
+        with metrics.time("rpc_read"):
+            current = await asyncio.to_thread(writer.read_labels, rid, FILLED_CHECK_LABELS)
+        unchecked = [l for l in FILLED_CHECK_LABELS if l not in current]
+        if all(current.values()):
+            if not unchecked:
+                return "skipped"
+            if page is not None:
+                if await open_product(page, state.name, state.sku):
+                    await open_website_edit(page)
+                    if await is_all_fields_filled(page, unchecked):
+                        return "skipped"
+        state.checked = True
+
+    await ensure_payload(state)
+    state.enter("write")
+    with metrics.time("rpc_write"):
+        written = await asyncio.to_thread(writer.write_labels, rid, payload_by_label(state.data))
+    leftover = [label for key, label, _, _ in PAYLOAD_FIELDS if state.data.get(key) and label not in written]
+    if leftover and page is not None:
+        st = await process_one_browser(page, state, leftover)
+        if st != "updated":
+            return st
     return "updated"
 
+async def process_one(page: Optional[Page], state: ItemState, rpc_writer: Optional[RpcWriter] = None) -> str:
+    """`state.data` is the prefetched payload from the generation stage (None = generate inline)."""
+    if rpc_writer is not None:
+        st = await process_one_rpc(page, rpc_writer, state)
+        if st is not None:
+            return st
+    return await process_one_browser(page, state)
+
+async def capture_failure(page: Optional[Page], worker_id: int) -> str:
+    """Screenshot for an item that failed for good (never for failures a retry fixed)."""
+    if page is None or page.is_closed():
+        return ""
+    path = os.path.join(RUN_ARTIFACTS_DIR, f"error_{int(time.time())}_{worker_id}.png")
+    try:
+        os.makedirs(RUN_ARTIFACTS_DIR, exist_ok=True)
+        await page.screenshot(path=path, full_page=True)
+    except Exception:
+        return ""
+    return path
+
 # ---------------------------------------------------------------------
 # CSV loader (local or url)
 # ---------------------------------------------------------------------
-def read_sheet_rows(source: str) -> List[Dict[str, str]]:
+class SheetStream:
     """
-    Load CSV either from a URL (http/https) or local file path, robust to spaces and case.
+    Streams CSV rows from a local file or URL (chunked, never the whole body in memory),
+    normalizes them and drops repeats of the same name+SKU. Iterate once.
     """
-    if not source:
-        return []
+    def __init__(self, source: str, dedupe: bool = True, validators: Optional[Dict[str, str]] = None,
+                 hash_columns: Optional[List[str]] = None):
+        self.source = source
+        self.dedupe = dedupe
+        self.validators = validators or {}  # etag / last_modified from the last successful sync
+        self.hash_columns = hash_columns
+        self.rows = 0
+        self.duplicates = 0
+        self.not_modified = False
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self._handle = None  # (file, close) once open() ran
 
-    # load file content (local or URL)
-    if os.path.exists(source) and not source.startswith("http"):
-        with open(source, "r", encoding="utf-8-sig", newline="") as f:
-            raw = f.read().strip()
-    else:
-        r = requests.get(source, timeout=30)
+    def open(self) -> bool:
+        """Send the (conditional) request now; False when the sheet is unchanged (HTTP 304)."""
+        if self._handle is None and self.source:
+            self._handle = self._open()
+        return not self.not_modified
+
+    def _open(self):
+        if os.path.exists(self.source) and not self.source.startswith("http"):
+            f = open(self.source, "r", encoding="utf-8-sig", newline="")
+            return f, f.close
+        headers = {}
+        if self.validators.get("etag"):
+            headers["If-None-Match"] = self.validators["etag"]
+        if self.validators.get("last_modified"):
+            headers["If-Modified-Since"] = self.validators["last_modified"]
+        r = requests.get(self.source, timeout=30, stream=True, headers=headers)
+        if r.status_code == 304:
+            self.not_modified = True
+            r.close()
+            return None, None
         r.raise_for_status()
-        raw = r.content.decode("utf-8-sig", errors="replace").strip()
-
-    reader = csv.DictReader(io.StringIO(raw))
-    rows = []
-    for row in reader:
-        # normalize all keys (strip and lowercase)
-        normalized = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
-        pn = normalized.get("product name") or normalized.get("name") or normalized.get("product")
-        sku = normalized.get("sku")
-        if pn:
-            rows.append({"Product Name": pn, "SKU": sku})
-    return rows
+        self.etag = r.headers.get("ETag")
+        self.last_modified = r.headers.get("Last-Modified")
+        r.raw.decode_content = True  # let urllib3 undo gzip while streaming
+        r.raw.auto_close = False  # else urllib3 closes at end of body and TextIOWrapper's next read raises
+        return io.TextIOWrapper(r.raw, encoding="utf-8-sig", errors="replace", newline=""), r.close
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        if not self.source:
+            return
+        f, close = self._handle or self._open()
+        self._handle = None
+        if f is None:
+            return
+        seen = set()
+        try:
+            for row in csv.DictReader(f):
+                # normalize all keys (strip and lowercase)
+                normalized = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+                pn = normalized.get("product name") or normalized.get("name") or normalized.get("product")
+                sku = normalized.get("sku")
+                if not pn:
+                    continue
+                if self.dedupe:
+                    key = row_key(pn, sku)
+                    if key in seen:
+                        self.duplicates += 1
+                        continue
+                    seen.add(key)
+                self.rows += 1
+                yield {"Product Name": pn, "SKU": sku, "Row Hash": row_hash(normalized, self.hash_columns)}
+        finally:
+            close()
+
+def read_sheet_rows(source: str) -> List[Dict[str, str]]:
+    """
+    Load CSV either from a URL (http/https) or local file path, robust to spaces and case.
+    """
+    return list(SheetStream(source))
 
 # ---------------------------------------------------------------------
 # logging + concurrency
 # ---------------------------------------------------------------------
+journal: Optional[RunJournal] = None  # opened by main_async; batch_log.csv is exported from it
+
+sync_state: Optional[SyncState] = None  # incremental mode only
+row_hashes: Dict[str, str] = {}  # row key -> content hash of the queued row
+synced_rows: List[tuple] = []  # (row key, hash) of rows that finished this run
+dead_letters = DeadLetters(DEAD_LETTER_PATH)  # re-created by main_async (shard paths)
+
 def append_log(name: str, sku: str, status: str, note: str = ""):
-    path = "batch_log.csv"
-    exists = os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if not exists:
-            w.writerow(["Timestamp", "Product Name", "SKU", "Status", "Note"])
-        w.writerow([datetime.now().isoformat(timespec="seconds"), name, sku, status, note])
-
-async def worker(p, queue: asyncio.Queue, progress: tqdm, worker_id: int):
-    ctx, page = await login_and_open_context(p, HEADLESS, SLOWMO_MS)
+    journal.record(name, sku, "done", status, note)
+    if status in DONE_STATUSES:
+        key = row_key(name, sku)
+        if key in row_hashes:
+            synced_rows.append((key, row_hashes.pop(key)))
+
+def log_stage(name: str, sku: str, stage: str):
+    journal.record(name, sku, stage)
+
+class PipelineStats:
+    """
+    Samples both queues while the run is going. A mostly-empty ready queue means the
+    writers are starved (LLM is the bottleneck); a mostly-full one means the browsers are.
+    """
+    def __init__(self, rows_q: asyncio.Queue, ready_q: asyncio.Queue):
+        self.rows_q = rows_q
+        self.ready_q = ready_q
+        self.gen_busy = 0
+        self.writers_busy = 0
+        self.samples = 0
+        self.ready_empty = 0
+        self.ready_full = 0
+        self.ready_total = 0
+
+    def sample(self):
+        depth = self.ready_q.qsize()
+        self.samples += 1
+        self.ready_total += depth
+        if depth == 0: self.ready_empty += 1
+        if self.ready_q.maxsize and depth >= self.ready_q.maxsize: self.ready_full += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"pending": self.rows_q.qsize(), "ready": self.ready_q.qsize(),
+                "gen": self.gen_busy, "write": self.writers_busy}
+
+    def summary(self) -> str:
+        if not self.samples:
+            return "Pipeline: no samples"
+        n = self.samples
+        return (f"Pipeline: ready queue avg {self.ready_total / n:.1f}/{self.ready_q.maxsize}, "
+                f"empty {100 * self.ready_empty / n:.0f}% (writers waiting on LLM), "
+                f"full {100 * self.ready_full / n:.0f}% (LLM waiting on writers)")
+
+async def report_pipeline(stats: PipelineStats, progress: tqdm):
+    while True:
+        await asyncio.sleep(PIPELINE_REPORT_S)
+        stats.sample()
+        progress.set_postfix(stats.snapshot(), refresh=False)
+
+class IngestStats:
+    def __init__(self):
+        self.read = 0
+        self.already_done = 0
+        self.preflight_skipped = 0
+        self.unchanged = 0
+        self.queued = 0
+
+async def feed_rows(stream: SheetStream, rows_q: asyncio.Queue, consumers: int, progress: tqdm,
+                    ingest: IngestStats, scan_writer: Optional[RpcWriter], done_keys: set):
+    """
+    Stage 0: pull the sheet in chunks off the event loop and push rows into the bounded
+    rows queue, so generation starts on row 1 while the download is still running.
+    """
+    it = iter(stream)
+    if shard is not None:
+        it = (r for r in it if shard_of(row_key(r["Product Name"], r.get("SKU")), shard[1]) == shard[0])
+    if BATCH_LIMIT > 0:
+        it = itertools.islice(it, BATCH_LIMIT)
     try:
         while True:
+            chunk = await asyncio.to_thread(lambda: list(itertools.islice(it, INGEST_CHUNK)))
+            if not chunk:
+                break
+            ingest.read += len(chunk)
+            fresh = [r for r in chunk if row_key(r["Product Name"], r.get("SKU")) not in done_keys]
+            ingest.already_done += len(chunk) - len(fresh)
+            keyed = [(row_key(r["Product Name"], r.get("SKU")), r["Row Hash"]) for r in fresh]
+            if sync_state is not None and fresh:
+                same = sync_state.unchanged(keyed)
+                fresh = [r for r, (k, _) in zip(fresh, keyed) if k not in same]
+                ingest.unchanged += len(keyed) - len(fresh)
+            row_hashes.update(keyed)
+            if scan_writer is not None and fresh:
+                remaining = await preflight_scan(fresh, scan_writer)
+                if remaining is None:
+                    scan_writer = None  # don't retry a dead scan for every chunk
+                else:
+                    ingest.preflight_skipped += len(fresh) - len(remaining)
+                    fresh = remaining
+            for r in fresh:
+                if ingest.queued < 3:
+                    print(f" • {r['Product Name']} ({r.get('SKU', '')})")
+                log_stage(r["Product Name"], r.get("SKU", ""), "queued")
+                ingest.queued += 1
+                progress.total += 1
+                await rows_q.put(r)  # backpressure: waits while the queue is full
+            progress.refresh()
+            if budget_exceeded():
+                break  # the rest of the sheet stays unqueued for --resume
+    finally:
+        for _ in range(consumers):
+            await rows_q.put(None)
+
+async def gen_stage(rows_q: asyncio.Queue, ready_q: asyncio.Queue, progress: tqdm, stats: PipelineStats):
+    """Stage 1: pull rows, generate payloads ahead of the browsers, hand them over."""
+    while True:
+        item = await rows_q.get()
+        if item is None:
+            return
+        name = item["Product Name"]
+        data = item.get("Payload")  # dead-letter rows bring the payload they already had
+        if data is None and budget_exceeded():
+            append_log(name, item.get("SKU", ""), "budget", budget_stop)  # not done: --resume requeues it
+            progress.update(1)
+            continue
+        # only rows the pre-flight scan saw unfilled are generated ahead; the rest are generated
+        # by the writer after its own fill check, so already-complete products cost no tokens
+        if PIPELINE_PREFETCH > 0 and data is None and item.get("Unfilled"):
+            stats.gen_busy += 1
             try:
-                # Wait for next available product (prevents duplicates)
-                item = await queue.get()
-            except asyncio.CancelledError:
+                for attempt in range(STAGE_MAX_RETRIES + 1):
+                    try:
+                        data = await gen_override_and_meta(name)
+                        break
+                    except Exception as e:
+                        err = f"generate: {type(e).__name__}: {e}"
+                        if attempt >= STAGE_MAX_RETRIES:
+                            print(f"[⚠ gen] {name} — {err} (gave up after {attempt + 1} attempts)")
+                            state = ItemState(item)
+                            state.stage, state.attempts = "generate", attempt + 1
+                            dead_letters.add(state.dead_letter(err))
+                            append_log(name, item.get("SKU", ""), "error", err)
+                            break
+                        delay = backoff_delay(attempt, STAGE_RETRY_BASE_S, STAGE_RETRY_MAX_S)
+                        print(f"[↻ gen] {name} — {err}; retrying in {delay:.1f}s")
+                        log_stage(name, item.get("SKU", ""), "retry:generate")
+                        await asyncio.sleep(delay)
+            finally:
+                stats.gen_busy -= 1
+            if data is None:
+                progress.update(1)
+                continue
+            log_stage(name, item.get("SKU", ""), "generated")
+        await ready_q.put((item, data))  # blocks once PIPELINE_PREFETCH payloads are waiting
+
+async def worker(session: Optional[BrowserSession], queue: asyncio.Queue, progress: tqdm, worker_id: int,
+                 rpc_writer: Optional[RpcWriter] = None, stats: Optional[PipelineStats] = None,
+                 gate: Optional[WorkerGate] = None, control: Optional[AimdController] = None):
+    """
+    Stage 2: navigation + fills only; a None item means the generation stage is done.
+    With a gate, a worker above the current limit closes its context and parks until needed.
+    """
+    current_worker.set(worker_id)
+    ctx, page = None, None
+    try:
+        while True:
+            if gate is not None and not gate.active(worker_id):
+                if ctx is not None:
+                    await ctx.close()
+                    ctx, page = None, None
+                await gate.wait_active(worker_id)
+
+            entry = await queue.get()
+            if entry is None:
+                queue.task_done()
                 break
+            item, data = entry
+            # pure RPC runs never need a browser
+            if ctx is None and session is not None:
+                try:
+                    ctx, page = await session.open_page()
+                except BaseException:
+                    queue.task_done()
+                    raise
 
             name = item["Product Name"]
             sku = item.get("SKU", "")
 
+            if stats: stats.writers_busy += 1
+            if control is not None and stats is not None:
+                control.note_load(stats.writers_busy)
+            log_stage(name, sku, "writing")
+            state = ItemState(item, data)
+            t0 = time.monotonic()
+            st = "error"
             try:
-                st = await process_one(page, name, sku)
-                msg = {"updated": "✓", "skipped": "→", "not_found": "✗"}.get(st, "⚠")
-                print(f"[{msg} {worker_id}] {name} — {st}")
-                append_log(name, sku, st)
-            except Exception as e:
-                print(f"[⚠ {worker_id}] {name} — {e}")
-                append_log(name, sku, "error", f"{type(e).__name__}: {e}")
-                traceback.print_exc(file=sys.stdout)
+                for attempt in range(STAGE_MAX_RETRIES + 1):
+                    state.attempts = attempt + 1
+                    try:
+                        st = await process_one(page, state, rpc_writer)
+                        break
+                    except Exception as e:
+                        err = f"{state.stage}: {type(e).__name__}: {e}"
+                        if attempt >= STAGE_MAX_RETRIES:
+                            shot = await capture_failure(page, worker_id)
+                            dead_letters.add(state.dead_letter(err, shot))
+                            print(f"[⚠ {worker_id}] {name} — {err} (gave up after {state.attempts} attempts)")
+                            append_log(name, sku, "error", err)
+                            traceback.print_exc(file=sys.stdout)
+                            break
+                        delay = backoff_delay(attempt, STAGE_RETRY_BASE_S, STAGE_RETRY_MAX_S)
+                        print(f"[↻ {worker_id}] {name} — {err}; retrying from '{state.stage}' in {delay:.1f}s")
+                        log_stage(name, sku, f"retry:{state.stage}")
+                        await asyncio.sleep(delay)
+                        if page is not None and page.is_closed():
+                            await session.discard(ctx)
+                            ctx, page = await session.open_page()
+                if st != "error":
+                    msg = {"updated": "✓", "skipped": "→", "not_found": "✗"}.get(st, "⚠")
+                    print(f"[{msg} {worker_id}] {name} — {st}")
+                    append_log(name, sku, st)
             finally:
+                elapsed = time.monotonic() - t0
+                metrics.item_done(st, elapsed)
+                if control is not None:
+                    control.observe(elapsed, ok=st != "error")
+                if stats: stats.writers_busy -= 1
                 progress.update(1)
                 queue.task_done()  # mark product as finished
 
-            if queue.empty():
-                break
+            if memory_watch is not None and ctx is not None:
+                reason = await memory_watch.item_done(worker_id, page)
+                if reason:
+                    print(f"[♻ {worker_id}] recycling {RECYCLE_SCOPE} ({reason})")
+                    memory_watch.recycled(worker_id, reason)
+                    try:
+                        ctx, page = await session.recycle(ctx, page, RECYCLE_SCOPE)
+                    except Exception as e:
+                        # drop it; the next item opens a context the usual way
+                        print(f"[⚠ {worker_id}] recycle failed: {type(e).__name__}: {e}")
+                        await session.discard(ctx)
+                        ctx, page = None, None
     finally:
-        await ctx.close()
+        if ctx is not None:
+            await ctx.close()
 
 # ---------------------------------------------------------------------
 # main
 # ---------------------------------------------------------------------
-async def main_async():
+async def main_async(cache_mode: str = GEN_CACHE, resume: Optional[str] = None, incremental: bool = SYNC_INCREMENTAL,
+                     dead_letter: Optional[str] = None, payloads: Optional[str] = None):
+    global journal, sync_state, dead_letters
     source = BATCH_CSV_PATH if BATCH_CSV_PATH else BATCH_CSV_URL
-    rows = read_sheet_rows(source)
-    if not rows:
-        print("No rows found in CSV (need headers: 'Product Name','SKU').")
+    if payloads:
+        if not os.path.exists(payloads):
+            print(f"No payload file at {payloads}; run the generate command first.")
+            return
+        source = payloads
+        print(f"Applying stored payloads from {payloads} (no LLM calls)")
+    if dead_letter:
+        if not os.path.exists(dead_letter):
+            print(f"No dead-letter file at {dead_letter}; nothing to retry.")
+            return
+        # move it aside so this run's own failures start a fresh file
+        source = f"{dead_letter}.{new_run_id()}.consumed"
+        os.replace(dead_letter, source)
+        print(f"Retrying dead letters from {dead_letter} (moved to {source})")
+    if not source:
+        print("No CSV source configured (set BATCH_CSV_PATH or BATCH_CSV_URL).")
         return
+    dead_letters = DeadLetters(DEAD_LETTER_PATH)
 
-    total_products = len(rows)
-    if BATCH_LIMIT > 0:
-        rows = rows[:BATCH_LIMIT]
-        print(f"Loaded {total_products} total products; processing first {BATCH_LIMIT} (BATCH_LIMIT)")
+    # per-shard journal source + sync state, so one shard's 304 never hides another's rows
+    label = source if shard is None else f"{source}#shard{shard[0]}of{shard[1]}"
+    journal = RunJournal(RUN_JOURNAL_PATH)
+    run_id = new_run_id()
+    if resume:
+        run_id = journal.latest_resumable_run() if resume == "latest" else resume
+        if not run_id:
+            print("No unfinished run to resume; starting a new one.")
+            run_id, resume = new_run_id(), None
+    journal.begin(run_id, label)
+    done_keys = journal.done_keys(run_id) if resume else set()
+    if resume:
+        print(f"Resuming run {run_id}: {len(done_keys)} rows already done; requeueing the rest.")
+    else:
+        print(f"Run id: {run_id} (resume with --resume {run_id})")
+    journal.start_writer()
+
+    if incremental:
+        sync_state = SyncState(SYNC_STATE_PATH, label)
+        print(f"Incremental sync: only rows new or changed since the last run ({SYNC_STATE_PATH})")
+    if payloads:
+        stream = PayloadStream(source)
+    elif dead_letter:
+        stream = DeadLetterStream(source)
     else:
-        print(f"Loaded {total_products} products (no batch limit).")
+        stream = SheetStream(source, validators=sync_state.validators() if sync_state else None,
+                             hash_columns=SYNC_COLUMNS)
 
-    print(f"Concurrency = {MAX_CONCURRENT}, Headless = {HEADLESS}")
+    completed = False
+    try:
+        completed = await run_pipeline(stream, cache_mode, done_keys)
+    finally:
+        await journal.close_writer()
+        if completed:
+            journal.finish()
+        if sync_state is not None:
+            sync_state.mark_synced(synced_rows)
+            # only trust a 304 next time if this whole download was processed without leftovers
+            clean = set(journal.counts()) <= set(DONE_STATUSES)
+            if completed and clean and BATCH_LIMIT <= 0 and not stream.not_modified:
+                sync_state.save_validators(stream.etag, stream.last_modified)
+            sync_state.close()
+        n = journal.export_csv(BATCH_LOG_PATH)
+        write_metrics()
+        print(f"Metrics: {METRICS_JSON_PATH or '-'} (JSON), {METRICS_PROM_PATH or '-'} (Prometheus text)")
+        counts = ", ".join(f"{k}={v}" for k, v in sorted(journal.counts().items()))
+        print(f"Journal: run {run_id} — {counts} ({n} rows exported to {BATCH_LOG_PATH})")
+        if dead_letters.count:
+            print(f"Dead letters: {dead_letters.count} items -> {DEAD_LETTER_PATH} (retry with --dead-letter)")
+        journal.close()
+
+def write_metrics():
+    try:
+        metrics.write(METRICS_JSON_PATH, METRICS_PROM_PATH)
+    except OSError as e:
+        print(f"[metrics] could not write snapshot: {e}")
+
+async def snapshot_metrics():
+    while True:
+        await asyncio.sleep(METRICS_SNAPSHOT_S)
+        await asyncio.to_thread(write_metrics)
+
+def make_controllers(ready_q: asyncio.Queue):
+    """Writer gate + AIMD controllers for writers and LLM calls (all None when adaptive mode is off)."""
+    global llm_control
+    if not ADAPTIVE_CONCURRENCY:
+        return None, None, None
+    gate = WorkerGate(MAX_CONCURRENT)
+    writer_control = AimdController("browser writers", MAX_CONCURRENT, ADAPT_WRITERS_MIN, ADAPT_WRITERS_MAX,
+                                    gate.set_limit, ADAPT_WRITE_TARGET_S, ADAPT_MAX_ERROR_RATE,
+                                    demand=lambda: ready_q.qsize() > 0)
+    gate.limit = writer_control.limit
+    limiter = llm_limiter()
+    llm_control = AimdController("LLM in flight", GEN_MAX_IN_FLIGHT, ADAPT_LLM_MIN, ADAPT_LLM_MAX,
+                                 limiter.set_max_in_flight, ADAPT_LLM_TARGET_S, ADAPT_MAX_ERROR_RATE)
+    limiter.max_in_flight = llm_control.limit
+    print(f"Adaptive concurrency: writers {writer_control.limit} ({writer_control.lo}-{writer_control.hi}), "
+          f"LLM in flight {llm_control.limit} ({llm_control.lo}-{llm_control.hi}), every {ADAPT_INTERVAL_S:.0f}s")
+    return gate, writer_control, llm_control
+
+async def run_pipeline(stream: SheetStream, cache_mode: str, done_keys: set) -> bool:
+    global content_cache, record_index, browser_session, memory_watch
+    # the conditional GET goes first: an unchanged sheet costs one request, no RPC and no browser
+    if isinstance(stream, SheetStream) and not await asyncio.to_thread(stream.open):
+        print("Sheet not modified since the last complete sync (HTTP 304) — nothing to do.")
+        return True
+    rpc_writer = make_rpc_writer()
+    scan_writer = rpc_writer or make_rpc_writer(force=True)
+    if RECORD_INDEX:
+        record_index = await asyncio.to_thread(load_record_index, scan_writer)
+
+    print(f"Concurrency = {MAX_CONCURRENT}, Headless = {HEADLESS}, Writer = {WRITER_BACKEND}")
+    print(f"Pipeline: {GEN_CONCURRENCY} generators, prefetch depth = {PIPELINE_PREFETCH}, "
+          f"batch limit = {BATCH_LIMIT or 'ALL'}")
     print("\nPreview of products being processed:")
-    for r in rows[:3]:
-        print(f" • {r['Product Name']} ({r.get('SKU', '')})")
 
-    # prepare queue
-    q = asyncio.Queue()
-    for r in rows:
-        q.put_nowait(r)
+    # queues: sheet -> [feeder] -> rows (bounded) -> [generation stage] -> ready (bounded) -> [browser writers]
+    rows_q = asyncio.Queue(maxsize=INGEST_QUEUE_MAX)
+    ready_q = asyncio.Queue(maxsize=max(1, PIPELINE_PREFETCH))
+    stats = PipelineStats(rows_q, ready_q)
+    ingest = IngestStats()
 
-    async with async_playwright() as p:
-        bar = tqdm(total=len(rows), desc="Batch progress", unit="item")
-        try:
-            tasks = [asyncio.create_task(worker(p, q, bar, i + 1)) for i in range(MAX_CONCURRENT)]
-            await asyncio.gather(*tasks)
-        finally:
-            bar.close()
+    content_cache = ContentCache(GEN_CACHE_PATH, cache_mode, GEN_CACHE_MAX_ENTRIES, GEN_CACHE_MAX_AGE_DAYS)
+    gate, writer_control, llm_ctl = make_controllers(ready_q)
+    n_writers = writer_control.hi if writer_control is not None else MAX_CONCURRENT
+
+    try:
+        async with async_playwright() as p:
+            if WRITER_BACKEND != "rpc":
+                net_filter = NetFilter(NET_FILTER, NET_BLOCK_TYPES, NET_BLOCK_URLS)
+                metrics.extra["net_filter"] = net_filter.as_dict
+                browser_session = await BrowserSession.start(p, HEADLESS, SLOWMO_MS, AUTH_STATE_PATH, net_filter)
+                memory_watch = MemoryWatch(MEM_SAMPLES_PATH, RECYCLE_HEAP_MB, RECYCLE_RENDERER_MB,
+                                           RECYCLE_EVERY_ITEMS, MEM_SAMPLE_EVERY)
+                metrics.extra["page_memory"] = memory_watch.as_dict
+            bar = tqdm(total=0, desc="Batch progress", unit="item")
+            reporter = asyncio.create_task(report_pipeline(stats, bar))
+            snapshots = asyncio.create_task(snapshot_metrics()) if METRICS_SNAPSHOT_S > 0 else None
+            adapter = (asyncio.create_task(run_controllers([writer_control, llm_ctl], ADAPT_INTERVAL_S))
+                       if writer_control is not None else None)
+            try:
+                writers = [asyncio.create_task(worker(browser_session, ready_q, bar, i + 1, rpc_writer, stats,
+                                                      gate, writer_control))
+                           for i in range(n_writers)]
+                generators = [asyncio.create_task(gen_stage(rows_q, ready_q, bar, stats))
+                              for _ in range(GEN_CONCURRENCY)]
+                feeder = asyncio.create_task(feed_rows(stream, rows_q, len(generators), bar, ingest,
+                                                       scan_writer if PREFLIGHT_SCAN else None, done_keys))
+
+                async def close_writers():
+                    await asyncio.gather(feeder, *generators)
+                    if gate is not None:
+                        # drain under the AIMD limit first; only then wake parked writers for their sentinel
+                        await ready_q.join()
+                        await gate.open_all()
+                    for _ in writers:
+                        await ready_q.put(None)
+
+                # a writer that dies (e.g. login failure) surfaces here instead of stalling the generators
+                await asyncio.gather(close_writers(), *writers)
+            finally:
+                reporter.cancel()
+                if adapter is not None:
+                    adapter.cancel()
+                if snapshots is not None:
+                    snapshots.cancel()
+                bar.close()
+                if browser_session is not None:
+                    await browser_session.close()
+    finally:
+        content_cache.close()
+        if memory_watch is not None:
+            memory_watch.close()
+
+    if not stream.rows:
+        print("No rows found in CSV (need headers: 'Product Name','SKU').")
+    print(f"\n✅ Batch completed: {ingest.queued} products processed (limit = {BATCH_LIMIT or 'ALL'}).")
+    if budget_stop:
+        print(f"⏹ Stopped early: {budget_stop}. Rows not generated stay open for --resume.")
+    print(f"Ingest: {ingest.read} rows read, {stream.duplicates} duplicates dropped, "
+          f"{ingest.already_done} already done in this run, {ingest.unchanged} unchanged since last sync, "
+          f"{ingest.preflight_skipped} skipped by pre-flight scan")
+    print(content_cache.summary())
+    print(llm_limiter().summary())
+    print(stats.summary())
+    if record_index is not None:
+        print(record_index.summary())
+    if browser_session is not None:
+        print(wait_stats.summary())
+        print(f"Rich-text fills: {fill_stats['fast']} fast, {fill_stats['typed']} typed")
+        print(f"Browser: 1 shared Chromium, up to {n_writers} contexts, {browser_session.logins} form logins")
+        print(browser_session.net_filter.summary())
+        print(memory_watch.summary())
+    for c in (writer_control, llm_ctl):
+        if c is not None:
+            print(c.summary())
+    if FIELD_VALIDATION:
+        print(field_stats.summary())
+    if families is not None:
+        print(families.summary())
+    print(metrics.summary())
+    return True
 
-    print(f"\n✅ Batch completed: {len(rows)} products processed (limit = {BATCH_LIMIT or 'ALL'}).")
+shard: Optional[Shard] = None  # set by --shard: this process only handles rows hashed to it
+
+def apply_shard(s: Shard):
+    """Give this process its own journal/log/metrics/login files and 1/K of the OpenAI limits."""
+    global shard, RUN_JOURNAL_PATH, BATCH_LOG_PATH, METRICS_JSON_PATH, METRICS_PROM_PATH, AUTH_STATE_PATH
+    global OPENAI_RPM, OPENAI_TPM, DEAD_LETTER_PATH, MEM_SAMPLES_PATH, GEN_TOKEN_BUDGET, GEN_COST_BUDGET_USD
+    shard = s
+    MEM_SAMPLES_PATH = shard_path(MEM_SAMPLES_PATH, s)
+    DEAD_LETTER_PATH = shard_path(DEAD_LETTER_PATH, s)
+    RUN_JOURNAL_PATH = shard_path(RUN_JOURNAL_PATH, s)
+    BATCH_LOG_PATH = shard_path(BATCH_LOG_PATH, s)
+    METRICS_JSON_PATH = shard_path(METRICS_JSON_PATH, s)
+    METRICS_PROM_PATH = shard_path(METRICS_PROM_PATH, s)
+    AUTH_STATE_PATH = shard_path(AUTH_STATE_PATH, s)
+    OPENAI_RPM /= s[1]
+    OPENAI_TPM /= s[1]
+    GEN_TOKEN_BUDGET //= s[1]
+    GEN_COST_BUDGET_USD /= s[1]
+    print(f"Shard {s[0]}/{s[1]}: journal {RUN_JOURNAL_PATH}, log {BATCH_LOG_PATH}")
+
+async def generate_offline(results: Optional[str] = None, collect: bool = False, submit: bool = True,
+                           wait: bool = True):
+    """
+    Phase 1 of the offline mode: sheet rows -> Batch API requests file -> validated
+    payloads appended to BATCH_PAYLOADS_PATH, keyed by row. `results` ingests an output
+    file downloaded earlier; `collect` waits for the batch recorded in the manifest.
+    Rows that already have a payload are not requested again.
+    """
+    store = BatchPayloads(BATCH_PAYLOADS_PATH)
+    if results is None and not collect:
+        source = BATCH_CSV_PATH if BATCH_CSV_PATH else BATCH_CSV_URL
+        if not source:
+            print("No CSV source configured (set BATCH_CSV_PATH or BATCH_CSV_URL).")
+            return
+        rows = iter(SheetStream(source))
+        if BATCH_LIMIT > 0:
+            rows = itertools.islice(rows, BATCH_LIMIT)
+        pending = batch_jobs.pending_batch(BATCH_REQUESTS_PATH)
+        if pending:
+            print(f"Batch {pending} from an earlier generate was never collected; run generate --collect first "
+                  f"(or delete {batch_jobs.manifest_path(BATCH_REQUESTS_PATH)} to abandon it).")
+            return
+        have = store.keys()
+        n = batch_jobs.write_requests(rows, BATCH_REQUESTS_PATH, lambda name: chat_request(build_prompt(name)), have)
+        print(f"Wrote {n} requests to {BATCH_REQUESTS_PATH} ({len(have)} rows already have a payload)")
+        if not n or not submit:
+            return
+        manifest = batch_jobs.load_manifest(BATCH_REQUESTS_PATH)
+        manifest["batch_id"] = await batch_jobs.submit(oa, BATCH_REQUESTS_PATH)
+        batch_jobs.save_manifest(BATCH_REQUESTS_PATH, manifest)
+        print(f"Submitted batch {manifest['batch_id']} (collect it later with: generate --collect)")
+        if not wait:
+            return
+    try:
+        manifest = batch_jobs.load_manifest(BATCH_REQUESTS_PATH)
+    except OSError:
+        print(f"No manifest for {BATCH_REQUESTS_PATH}; run generate first.")
+        return
+    if results is not None:
+        with open(results, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        if not manifest.get("batch_id"):
+            print(f"No submitted batch recorded for {BATCH_REQUESTS_PATH}.")
+            return
+        if manifest.get("collected"):
+            print(f"Batch {manifest['batch_id']} was already collected into {BATCH_PAYLOADS_PATH}.")
+            return
+        batch = await batch_jobs.wait(oa, manifest["batch_id"], BATCH_POLL_S)
+        text = "\n".join([await batch_jobs.download(oa, getattr(batch, "output_file_id", None)),
+                          await batch_jobs.download(oa, getattr(batch, "error_file_id", None))])
+
+    metrics.prices = {k: v * GEN_BATCH_DISCOUNT for k, v in metrics.prices.items()}
+    errors = invalid = 0
+    for cid, content, usage, err in batch_jobs.parse_results(text):
+        row = manifest["rows"].get(cid)
+        if row is None:
+            continue
+        name = row["Product Name"]
+        metrics.add_usage([name], usage)
+        data = None
+        if err is None:
+            try:
+                data = json.loads(content)
+            except ValueError:
+                err = "response is not valid JSON"
+        if err is None and not isinstance(data, dict):
+            err = "response is not a JSON object"
+        if err:
+            errors += 1
+            print(f"[batch] {name} — {err}")
+            continue
+        data = apply_guardrails(data, name)
+        problems = check_payload(data, name) if FIELD_VALIDATION else {}
+        if problems:
+            invalid += 1
+            print(f"[batch] {name} — fails validation: "
+                  + "; ".join(f"{k}: {', '.join(p)}" for k, p in problems.items()))
+            continue
+        store.add(row, data)
+    manifest["collected"] = True  # the next generate may write a new requests file
+    batch_jobs.save_manifest(BATCH_REQUESTS_PATH, manifest)
+    missing = len(manifest["rows"]) - store.added - invalid - errors
+    print(f"Batch results: {store.added} payloads stored in {BATCH_PAYLOADS_PATH}, {invalid} failed validation, "
+          f"{errors} errors, {missing} without a result (run generate again to request those)")
+    t = metrics.tokens
+    print(f"LLM tokens: {t['total']} total ({t['cached']} cached prompt tokens), "
+          f"${metrics.cost_usd():.4f} at batch prices")
 
 def main():
-    asyncio.run(main_async())
+    ap = argparse.ArgumentParser(description="Batch-fill Odoo PIM SEO fields from a CSV / Sheet export.")
+    ap.add_argument("--cache", choices=["on", "off", "refresh"], default=GEN_CACHE,
+                    help="generated-payload cache: use it, bypass it, or regenerate and overwrite (default: GEN_CACHE)")
+    ap.add_argument("--incremental", action="store_true", default=SYNC_INCREMENTAL,
+                    help="only process rows that are new or changed since the last run (default: SYNC_MODE)")
+    ap.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID",
+                    help="continue a run from the journal: skip rows already updated/skipped, "
+                         "requeue failed or unfinished ones (default: the latest run with such rows)")
+    ap.add_argument("--dead-letter", nargs="?", const=DEAD_LETTER_PATH, metavar="PATH",
+                    help="process the items of a dead-letter file instead of the sheet, reusing their saved "
+                         "payload and record id (default: DEAD_LETTER_PATH)")
+    ap.add_argument("--shard", metavar="i/K",
+                    help="process only shard i of K (0-based; rows split by a stable name+SKU hash), "
+                         "e.g. one per machine")
+    ap.add_argument("--shards", type=int, metavar="K",
+                    help="run K shard processes on this machine, then merge their logs")
+    ap.add_argument("--merge-shards", type=int, metavar="K",
+                    help="only merge the journals/metrics of K shards (after copying them from other hosts)")
+    sub = ap.add_subparsers(dest="command", metavar="{generate,apply}",
+                            help="two-phase offline mode (without a command: generate and write in one run)")
+    gen_cmd = sub.add_parser("generate", help="write the sheet's prompts as a Batch API requests file, submit it "
+                                          "and store the validated payloads (BATCH_PAYLOADS_PATH)")
+    gen_cmd.add_argument("--no-submit", action="store_true", help="only write BATCH_REQUESTS_PATH")
+    gen_cmd.add_argument("--no-wait", action="store_true", help="submit and exit; pick the results up with --collect")
+    gen_cmd.add_argument("--collect", action="store_true", help="wait for the submitted batch and store its payloads")
+    gen_cmd.add_argument("--results", metavar="PATH", help="store the payloads of an already downloaded batch output file")
+    apply_cmd = sub.add_parser("apply", help="write stored payloads to Odoo (browser or RPC writers), no LLM calls")
+    apply_cmd.add_argument("--payloads", default=BATCH_PAYLOADS_PATH, metavar="PATH",
+                     help="payload file from generate (default: BATCH_PAYLOADS_PATH)")
+    args = ap.parse_args()
+    if args.command == "generate":
+        asyncio.run(generate_offline(args.results, args.collect, not args.no_submit, not args.no_wait))
+        return
+    if args.command == "apply":
+        asyncio.run(main_async(cache_mode=args.cache, resume=args.resume, payloads=args.payloads))
+        return
+    if args.merge_shards:
+        merge_shards(args.merge_shards, RUN_JOURNAL_PATH, BATCH_LOG_PATH, METRICS_JSON_PATH)
+        return
+    if args.shards:
+        passthrough = ["--cache", args.cache] + (["--incremental"] if args.incremental else [])
+        if args.dead_letter:
+            passthrough.append("--dead-letter")  # each shard retries its own file
+        if args.resume:
+            passthrough += ["--resume", args.resume]
+        codes = run_shards(args.shards, os.path.abspath(__file__), passthrough)
+        merge_shards(args.shards, RUN_JOURNAL_PATH, BATCH_LOG_PATH, METRICS_JSON_PATH)
+        sys.exit(max(codes))
+    if args.shard:
+        default_dead_letter = DEAD_LETTER_PATH
+        try:
+            apply_shard(parse_shard(args.shard))
+        except ValueError as e:
+            ap.error(str(e))
+        if args.dead_letter == default_dead_letter:
+            args.dead_letter = DEAD_LETTER_PATH  # the shard's own file
+    asyncio.run(main_async(cache_mode=args.cache, resume=args.resume, incremental=args.incremental,
+                           dead_letter=args.dead_letter))
 
 if __name__ == "__main__":
     main()
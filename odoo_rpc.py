@@ -0,0 +1,212 @@
+import re, threading, html
+import xmlrpc.client
+from typing import Dict, List, Optional, Tuple
+
+# ---------------------------------------------------------------------
+# Odoo external API (XML-RPC) client
+# ---------------------------------------------------------------------
+def rpc_base_url(url: str) -> str:
+    """
+    Turn OD_URL (usually .../web/login) into the server root used by /xmlrpc/2/*.
+    """
+    url = (url or "").strip().rstrip("/")
+    return re.sub(r"/(web|odoo)(/.*)?$", "", url)
+
+class _TimeoutTransport(xmlrpc.client.SafeTransport):
+    def __init__(self, timeout: float, use_https: bool):
+        super().__init__()
+        self._timeout = timeout
+        self._https = use_https
+
+    def make_connection(self, host):
+        if self._https:
+            conn = super().make_connection(host)
+        else:
+            conn = xmlrpc.client.Transport.make_connection(self, host)
+        conn.timeout = self._timeout
+        return conn
+
+class OdooRpc:
+    """
+    Thin wrapper around Odoo's /xmlrpc/2/common + /xmlrpc/2/object endpoints.
+    ServerProxy is not thread-safe, so each thread (asyncio.to_thread) gets its own proxies.
+    """
+    def __init__(self, url: str, db: str, login: str, password: str, timeout: float = 30.0):
+        self.base = rpc_base_url(url)
+        self.db = db
+        self.login = login
+        self.password = password
+        self.timeout = timeout
+        self.uid: Optional[int] = None
+        self._local = threading.local()
+        self._auth_lock = threading.Lock()
+
+    def _proxy(self, endpoint: str) -> xmlrpc.client.ServerProxy:
+        cache = getattr(self._local, "proxies", None)
+        if cache is None:
+            cache = self._local.proxies = {}
+        if endpoint not in cache:
+            transport = _TimeoutTransport(self.timeout, self.base.startswith("https"))
+            cache[endpoint] = xmlrpc.client.ServerProxy(
+                f"{self.base}/xmlrpc/2/{endpoint}", transport=transport, allow_none=True
+            )
+        return cache[endpoint]
+
+    def authenticate(self) -> int:
+        with self._auth_lock:
+            if self.uid:
+                return self.uid
+            if not self.db:
+                dbs = self._proxy("db").list()
+                if len(dbs) != 1:
+                    raise RuntimeError(f"OD_DB not set and server lists {len(dbs)} databases")
+                self.db = dbs[0]
+            uid = self._proxy("common").authenticate(self.db, self.login, self.password, {})
+            if not uid:
+                raise RuntimeError("Odoo RPC authentication failed (check OD_EMAIL / OD_PASS / OD_DB)")
+            self.uid = uid
+            return uid
+
+    def execute(self, model: str, method: str, *args, **kwargs):
+        uid = self.authenticate()
+        return self._proxy("object").execute_kw(self.db, uid, self.password, model, method, list(args), kwargs)
+
+    def search_read(self, model: str, domain: list, fields: List[str], limit: int = 0, offset: int = 0) -> List[dict]:
+        return self.execute(model, "search_read", domain, fields=fields, limit=limit, offset=offset, order="id")
+
+    def write(self, model: str, ids: List[int], vals: dict) -> bool:
+        return self.execute(model, "write", ids, vals)
+
+    def fields_get(self, model: str) -> Dict[str, dict]:
+        return self.execute(model, "fields_get", attributes=["string", "type", "readonly"])
+
+# ---------------------------------------------------------------------
+# label-driven writer
+# ---------------------------------------------------------------------
+# Technical names we fall back to when the form label doesn't match a field's `string`.
+DEFAULT_FIELD_HINTS = {
+    "Website Slug": "seo_name",
+    "Website URL": "seo_name",
+    "Meta Title": "website_meta_title",
+    "Meta Description": "website_meta_description",
+}
+
+def text_to_html(value: str) -> str:
+    """
+    The browser path types plain text into the rich editor (one <p> per line);
+    mirror that when writing straight into an html field.
+    """
+    lines = (value or "").splitlines()
+    return "".join(f"<p>{html.escape(l)}</p>" if l.strip() else "<p><br></p>" for l in lines)
+
+def html_to_text(value) -> str:
+    if not value:
+        return ""
+    v = re.sub(r"<[^>]+>", " ", str(value))
+    v = re.sub(r"\s+", " ", html.unescape(v)).strip()
+    return v
+
+class RpcWriter:
+    """
+    Resolves the same form labels the browser helpers use to field names on `model`
+    (via fields_get), so callers speak labels and never care which backend wrote them.
+    Labels that can't be resolved are reported back so the browser path can fill them.
+    """
+    def __init__(self, rpc: OdooRpc, model: str = "product.template",
+                 field_map: Optional[Dict[str, str]] = None):
+        self.rpc = rpc
+        self.model = model
+        self.field_map = dict(field_map or {})
+        self._fields: Optional[Dict[str, dict]] = None
+        self._lock = threading.Lock()
+
+    def _model_fields(self) -> Dict[str, dict]:
+        with self._lock:
+            if self._fields is None:
+                self._fields = self.rpc.fields_get(self.model)
+            return self._fields
+
+    def field_for(self, label: str) -> Optional[Tuple[str, str]]:
+        """(field_name, field_type) for a form label, or None if the API can't reach it."""
+        fields = self._model_fields()
+        name = self.field_map.get(label)
+        if not name:
+            wanted = label.strip().lower()
+            for fname, meta in fields.items():
+                if (meta.get("string") or "").strip().lower() == wanted and not meta.get("readonly"):
+                    name = fname
+                    break
+        if not name:
+            name = DEFAULT_FIELD_HINTS.get(label)
+        if not name or name not in fields:
+            return None
+        return name, fields[name].get("type", "char")
+
+    def unreachable(self, labels: List[str]) -> List[str]:
+        return [l for l in labels if self.field_for(l) is None]
+
+    def find_product(self, product_name: str, sku: Optional[str]) -> Optional[int]:
+        """SKU (default_code) wins over name; ambiguous name matches are treated as not found."""
+        if sku:
+            recs = self.rpc.search_read(self.model, [("default_code", "=", sku)], ["id"], limit=2)
+            if len(recs) == 1:
+                return recs[0]["id"]
+        recs = self.rpc.search_read(self.model, [("name", "=", product_name)], ["id"], limit=2)
+        if len(recs) == 1:
+            return recs[0]["id"]
+        return None
+
+    def bulk_filled(self, products: List[Tuple[str, Optional[str]]], labels: List[str],
+                    chunk: int = 200) -> Dict[Tuple[str, Optional[str]], bool]:
+        """
+        Fill status for many (name, sku) pairs with a handful of search_read calls.
+        Only products that resolve to exactly one record are reported; if any label
+        isn't reachable over the API nothing is reported (the browser must decide).
+        """
+        resolved = [self.field_for(l) for l in labels]
+        if not all(resolved):
+            return {}
+        names = sorted({f[0] for f in resolved})
+        fetch = names + ["name", "default_code"]
+
+        def index(field: str, values: List[str]) -> Dict[str, List[dict]]:
+            out: Dict[str, List[dict]] = {}
+            for i in range(0, len(values), chunk):
+                part = values[i:i + chunk]
+                for rec in self.rpc.search_read(self.model, [(field, "in", part)], fetch):
+                    out.setdefault(rec.get(field) or "", []).append(rec)
+            return out
+
+        by_sku = index("default_code", sorted({s for _, s in products if s}))
+        by_name = index("name", sorted({n for n, _ in products}))
+        status = {}
+        for name, sku in products:
+            recs = by_sku.get(sku, []) if sku else []
+            if len(recs) != 1:
+                recs = by_name.get(name, [])
+            if len(recs) == 1:
+                status[(name, sku)] = all(html_to_text(recs[0].get(n)) for n in names)
+        return status
+
+    def read_labels(self, record_id: int, labels: List[str]) -> Dict[str, str]:
+        resolved = {l: self.field_for(l) for l in labels}
+        names = sorted({f[0] for f in resolved.values() if f})
+        if not names:
+            return {}
+        recs = self.rpc.search_read(self.model, [("id", "=", record_id)], names, limit=1)
+        rec = recs[0] if recs else {}
+        return {l: html_to_text(rec.get(f[0])) for l, f in resolved.items() if f}
+
+    def write_labels(self, record_id: int, values: Dict[str, str]) -> List[str]:
+        """Write every reachable label in one `write` call; return the labels written."""
+        vals, written = {}, []
+        for label, value in values.items():
+            f = self.field_for(label)
+            if not f or not value:
+                continue
+            fname, ftype = f
+            vals[fname] = text_to_html(value) if ftype == "html" else value
+            written.append(label)
+        if vals:
+            self.rpc.write(self.model, [record_id], vals)
+        return written
@@ -0,0 +1,152 @@
+import csv, os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from playwright.async_api import Page
+
+# ---------------------------------------------------------------------
+# per-worker memory watermarks (JS heap, DOM, renderer RSS) and recycling
+# ---------------------------------------------------------------------
+def _proc_tree(root: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(d))
+    out, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        out.append(pid)
+        todo.extend(children.get(pid, []))
+    return out
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def tree_rss_mb(root: int) -> float:
+    """Resident memory of a process and all its descendants (Chromium included); Linux only."""
+    return sum(_rss_kb(pid) for pid in _proc_tree(root)) / 1024
+
+def renderer_rss_mb(root: int) -> List[float]:
+    """RSS of each Chromium renderer below `root` (one per open site/context); [] off Linux."""
+    if not os.path.isdir("/proc"):
+        return []
+    out = []
+    for pid in _proc_tree(root):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"--type=renderer" not in f.read():
+                    continue
+        except OSError:
+            continue
+        out.append(_rss_kb(pid) / 1024)
+    return out
+
+SAMPLE_FIELDS = ["Timestamp", "Worker", "Items", "Items Since Recycle", "JS Heap MB", "DOM Nodes",
+                 "Renderer Max MB", "Renderers Total MB", "Renderers", "Recycled"]
+
+class MemoryWatch:
+    """
+    Samples each worker's page every `sample_every` items: JS heap and DOM node count
+    through CDP (Performance.getMetrics), plus the RSS of Chromium's renderer processes.
+    `item_done` says when a worker should recycle: its heap is over `heap_mb`, it has done
+    `max_items` since the last recycle, or the largest renderer is over `rss_mb` and this
+    worker has the biggest heap (renderers can't be tied to a page, the heap can).
+    Every sample is appended to a CSV for tuning the thresholds.
+    """
+    def __init__(self, path: str, heap_mb: float = 0, rss_mb: float = 0, max_items: int = 0, sample_every: int = 10):
+        self.path = path
+        self.heap_mb = heap_mb
+        self.rss_mb = rss_mb
+        self.max_items = max_items
+        self.sample_every = max(1, sample_every)
+        self.items: Dict[int, int] = {}
+        self.since: Dict[int, int] = {}
+        self.heap: Dict[int, float] = {}  # last JS heap per worker
+        self.peak_heap: Dict[int, float] = {}
+        self.peak_renderer = 0.0
+        self.recycles: Dict[str, int] = {}
+        self._cdp: Dict[int, tuple] = {}  # worker -> (page, CDP session)
+        if path:
+            new = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._f = open(path, "a", newline="", encoding="utf-8")
+            self._w = csv.writer(self._f)
+            if new:
+                self._w.writerow(SAMPLE_FIELDS)
+        else:
+            self._f = self._w = None
+
+    async def _page_metrics(self, worker_id: int, page: Page) -> Dict[str, float]:
+        cached = self._cdp.get(worker_id)
+        if cached is None or cached[0] is not page:
+            cdp = await page.context.new_cdp_session(page)
+            await cdp.send("Performance.enable")
+            cached = self._cdp[worker_id] = (page, cdp)
+        res = await cached[1].send("Performance.getMetrics")
+        return {m["name"]: m["value"] for m in res.get("metrics", [])}
+
+    async def item_done(self, worker_id: int, page: Optional[Page]) -> Optional[str]:
+        """Count one item; on sampling turns measure `page` and return a recycle reason (or None)."""
+        self.items[worker_id] = self.items.get(worker_id, 0) + 1
+        n = self.since[worker_id] = self.since.get(worker_id, 0) + 1
+        reason = None
+        if self.max_items and n >= self.max_items:
+            reason = f"items {n}"
+        if page is None or page.is_closed() or (n % self.sample_every and reason is None):
+            return reason
+        try:
+            m = await self._page_metrics(worker_id, page)
+        except Exception:
+            self._cdp.pop(worker_id, None)
+            return reason
+        heap = m.get("JSHeapUsedSize", 0) / 1e6
+        self.heap[worker_id] = heap
+        self.peak_heap[worker_id] = max(self.peak_heap.get(worker_id, 0.0), heap)
+        renderers = renderer_rss_mb(os.getpid())
+        top = max(renderers, default=0.0)
+        self.peak_renderer = max(self.peak_renderer, top)
+        if reason is None and self.heap_mb and heap > self.heap_mb:
+            reason = f"heap {heap:.0f} MB > {self.heap_mb:.0f} MB"
+        if (reason is None and self.rss_mb and top > self.rss_mb
+                and heap >= max(self.heap.values(), default=0.0)):
+            reason = f"renderer {top:.0f} MB > {self.rss_mb:.0f} MB"
+        if self._w is not None:
+            self._w.writerow([datetime.now().isoformat(timespec="seconds"), worker_id, self.items[worker_id], n,
+                              round(heap, 1), int(m.get("Nodes", 0)), round(top, 1), round(sum(renderers), 1),
+                              len(renderers), reason or ""])
+            self._f.flush()
+        return reason
+
+    def recycled(self, worker_id: int, reason: str):
+        self.since[worker_id] = 0
+        self.heap.pop(worker_id, None)
+        self._cdp.pop(worker_id, None)
+        kind = reason.split()[0]  # items | heap | renderer
+        self.recycles[kind] = self.recycles.get(kind, 0) + 1
+
+    def as_dict(self) -> Dict:
+        return {"recycles": dict(self.recycles), "peak_heap_mb": {str(w): round(v, 1) for w, v in self.peak_heap.items()},
+                "peak_renderer_mb": round(self.peak_renderer, 1)}
+
+    def summary(self) -> str:
+        peak = max(self.peak_heap.values(), default=0.0)
+        by = ", ".join(f"{k} {v}" for k, v in sorted(self.recycles.items())) or "none"
+        return (f"Page memory: peak JS heap {peak:.0f} MB, peak renderer {self.peak_renderer:.0f} MB, "
+                f"recycles: {by}" + (f" (samples in {self.path})" if self.path else ""))
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = self._w = None
@@ -0,0 +1,84 @@
+import time
+from typing import Awaitable, Dict, List
+
+from playwright.async_api import Page
+
+# ---------------------------------------------------------------------
+# condition-based waits for the Odoo web client (instead of fixed sleeps)
+# ---------------------------------------------------------------------
+WEB_CLIENT_READY = ".o_main_navbar, .o_home_menu, .o_apps"
+VIEW_READY = ".o_kanban_view, .o_list_view"
+FORM_READY = ".o_form_view"
+FORM_EDITABLE = ".o_form_view.o_form_editable, .o_form_view .o_form_editable"
+BUSY = ".o_loading_indicator, .o_blockUI, .o_loading"
+
+class WaitStats:
+    """Time spent in each named wait, how often it ran and how often it timed out."""
+    def __init__(self):
+        self.steps: Dict[str, List[float]] = {}  # step -> [count, total_s, timeouts]
+
+    def record(self, step: str, seconds: float, timed_out: bool):
+        s = self.steps.setdefault(step, [0, 0.0, 0])
+        s[0] += 1
+        s[1] += seconds
+        s[2] += int(timed_out)
+
+    def summary(self) -> str:
+        if not self.steps:
+            return "Waits: none recorded"
+        lines = ["Waits (step: count, avg ms, total s, timeouts):"]
+        for step, (n, total, tos) in sorted(self.steps.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"  {step}: {n}, {1000 * total / n:.0f} ms, {total:.1f} s, {tos}")
+        return "\n".join(lines)
+
+wait_stats = WaitStats()
+
+async def wait_step(step: str, awaitable: Awaitable) -> bool:
+    """Await one Playwright wait; a timeout is recorded and reported as False, never raised."""
+    t0 = time.monotonic()
+    ok = True
+    try:
+        await awaitable
+    except Exception:
+        ok = False
+    wait_stats.record(step, time.monotonic() - t0, not ok)
+    return ok
+
+async def wait_idle(page: Page, step: str, timeout_ms: int) -> bool:
+    """Odoo shows a loading indicator / block UI while RPCs are pending."""
+    return await wait_step(step, page.locator(BUSY).first.wait_for(state="hidden", timeout=timeout_ms))
+
+async def wait_logged_in(page: Page, timeout_ms: int) -> bool:
+    if not await wait_step("login", page.wait_for_url(lambda u: "/web/login" not in u, timeout=timeout_ms)):
+        return False
+    return await wait_step("web_client", page.locator(WEB_CLIENT_READY).first.wait_for(timeout=timeout_ms))
+
+async def wait_view_loaded(page: Page, timeout_ms: int) -> bool:
+    ok = await wait_step("pim_view", page.locator(VIEW_READY).first.wait_for(timeout=timeout_ms))
+    return ok and await wait_idle(page, "pim_idle", timeout_ms)
+
+async def wait_form_loaded(page: Page, timeout_ms: int) -> bool:
+    ok = await wait_step("form", page.locator(FORM_READY).first.wait_for(timeout=timeout_ms))
+    return ok and await wait_idle(page, "form_idle", timeout_ms)
+
+async def wait_form_editable(page: Page, timeout_ms: int) -> bool:
+    return await wait_step("edit_mode", page.locator(FORM_EDITABLE).first.wait_for(timeout=timeout_ms))
+
+def is_save_response(response) -> bool:
+    # /web/dataset/call_kw/<model>/web_save (17+) or .../write (≤16)
+    url = response.url
+    return "/web/dataset/call_kw" in url and (url.endswith("/web_save") or url.endswith("/write"))
+
+def is_record_read(record_id: int):
+    """Response predicate for the form's read of `record_id`: .../web_read (17+) or .../read (≤16)."""
+    def match(response) -> bool:
+        url = response.url
+        if "/web/dataset/call_kw" not in url or not (url.endswith("/web_read") or url.endswith("/read")):
+            return False
+        try:
+            args = ((response.request.post_data_json or {}).get("params") or {}).get("args") or []
+        except Exception:
+            return False
+        ids = args[0] if args else []
+        return record_id in (ids if isinstance(ids, list) else [ids])
+    return match
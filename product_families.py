@@ -0,0 +1,125 @@
+import asyncio, difflib, re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from field_rules import check_payload
+
+# ---------------------------------------------------------------------
+# product families: one generated payload shared by near-identical SKUs
+# ---------------------------------------------------------------------
+MASK = "#"
+
+def mask_name(name: str) -> Tuple[str, List[str]]:
+    """'Wix 51515 WIX Air Filter' -> ('wix # wix air filter', ['51515']): tokens with a digit are model parts."""
+    masked, models = [], []
+    for tok in (name or "").split():
+        if any(c.isdigit() for c in tok):
+            masked.append(MASK)
+            models.append(tok)
+        else:
+            masked.append(re.sub(r"[^\w&+-]+", "", tok.lower()) or tok.lower())
+    return " ".join(masked), models
+
+def family_key(name: str) -> Optional[str]:
+    """Brand (first word) + product type (words after the last model part); None without a model part."""
+    masked, models = mask_name(name)
+    words = masked.split()
+    if not models or len(words) < 2 or words[0] == MASK:
+        return None
+    last = len(words) - 1 - words[::-1].index(MASK)
+    kind = " ".join(words[last + 1:])
+    return f"{words[0]}|{kind}" if kind else None
+
+def _swap(text: str, mapping: Dict[str, str], edge: str = r"\w-") -> str:
+    # one pass, longest first, whole tokens only: "2853-20" never touches "2853-22" or "M18"
+    mapping = {k: v for k, v in mapping.items() if k}
+    if not mapping:
+        return text
+    alt = "|".join(re.escape(k) for k in sorted(mapping, key=len, reverse=True))
+    return re.sub(rf"(?<![{edge}])({alt})(?![{edge}])", lambda m: mapping[m.group(1)], text)
+
+def _slug_part(token: str) -> str:
+    return re.sub(r"[^a-z0-9-]+", "", token.lower()).strip("-")
+
+def derive_payload(template: Dict, rep_name: str, rep_models: List[str], name: str, models: List[str]) -> Dict:
+    """The family payload with the representative's name and model parts swapped for this member's."""
+    text_map = {a: b for a, b in zip(rep_models, models) if a != b}
+    slug_map = {_slug_part(a): _slug_part(b) for a, b in text_map.items()}
+    out = {}
+    for k, v in template.items():
+        if not isinstance(v, str):
+            out[k] = v
+        elif k == "website_slug":
+            out[k] = _swap(v, slug_map, edge="a-z0-9")
+        else:
+            out[k] = _swap(v.replace(rep_name, name), text_map)
+    return out
+
+class _Family:
+    def __init__(self, name: str, masked: str, models: List[str]):
+        self.name, self.masked, self.models = name, masked, models
+        self.template: "asyncio.Future[Optional[Dict]]" = asyncio.get_running_loop().create_future()
+        self.members = 0
+
+class ProductFamilies:
+    """
+    Groups rows by family_key as they stream in. The first row of a family is generated
+    normally and its payload becomes the template; later rows wait for it and get a copy
+    with their own name and model parts. A row whose masked name is less than
+    `min_similarity` like the representative's, has a different number of model parts,
+    or whose derived payload fails the field checks goes to individual generation.
+    """
+    def __init__(self, min_similarity: float = 0.9):
+        self.min_similarity = min_similarity
+        self.families: Dict[str, _Family] = {}
+        self.generated = 0
+        self.shared = 0
+        self.outliers: Dict[str, int] = {}
+
+    def _outlier(self, reason: str):
+        self.outliers[reason] = self.outliers.get(reason, 0) + 1
+
+    async def generate(self, name: str, gen: Callable[[str], Awaitable[Dict]]) -> Dict:
+        key = family_key(name)
+        if key is None:
+            return await gen(name)
+        masked, models = mask_name(name)
+        fam = self.families.get(key)
+        if fam is None:
+            fam = self.families[key] = _Family(name, masked, models)
+            try:
+                data = await gen(name)
+            except BaseException:
+                # let the next member become the representative instead
+                del self.families[key]
+                fam.template.set_result(None)
+                raise
+            self.generated += 1
+            fam.template.set_result(dict(data))
+            return data
+        similarity = difflib.SequenceMatcher(None, masked, fam.masked).ratio()
+        if similarity < self.min_similarity:
+            self._outlier("name differs")
+            return await gen(name)
+        if len(models) != len(fam.models):
+            self._outlier("model parts differ")
+            return await gen(name)
+        template = await asyncio.shield(fam.template)
+        if template is None:
+            return await gen(name)
+        data = derive_payload(template, fam.name, fam.models, name, models)
+        if check_payload(data, name):
+            self._outlier("derived payload failed checks")
+            return await gen(name)
+        fam.members += 1
+        self.shared += 1
+        return data
+
+    def as_dict(self) -> Dict:
+        return {"families": len(self.families), "generated": self.generated, "shared": self.shared,
+                "outliers": dict(self.outliers),
+                "largest": max((f.members + 1 for f in self.families.values()), default=0)}
+
+    def summary(self) -> str:
+        out = ", ".join(f"{k} {v}" for k, v in sorted(self.outliers.items())) or "none"
+        return (f"Product families: {len(self.families)} families, {self.shared} payloads shared "
+                f"(LLM calls saved), outliers generated individually: {out}")
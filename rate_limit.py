@@ -0,0 +1,137 @@
+import asyncio, random, time
+from contextlib import asynccontextmanager
+from typing import Mapping, Optional
+
+# ---------------------------------------------------------------------
+# token buckets for requests-per-minute / tokens-per-minute limits
+# ---------------------------------------------------------------------
+class TokenBucket:
+    """Continuous-refill bucket; `take` may drive the level negative to settle an underestimate."""
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+class RateLimiter:
+    """
+    Shared gate for every LLM call: RPM + TPM buckets, a cap on calls in flight,
+    and a global pause that a 429 / retry-after applies to all callers at once.
+    """
+    def __init__(self, rpm: float, tpm: float, max_in_flight: int):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._slots = asyncio.Condition()  # not a Semaphore: max_in_flight can change mid-run
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self.throttled = 0
+        self.waited_s = 0.0
+
+    async def _acquire(self, est_tokens: int):
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < self.max_in_flight)
+            self.in_flight += 1
+        try:
+            async with self._lock:  # FIFO: one caller drains the buckets at a time
+                while True:
+                    delay = max(0.0, self._paused_until - time.monotonic())
+                    if self.requests: delay = max(delay, self.requests.wait_time(1))
+                    if self.tokens: delay = max(delay, self.tokens.wait_time(est_tokens))
+                    if delay <= 0:
+                        break
+                    self.waited_s += delay
+                    await asyncio.sleep(delay)
+                if self.requests: self.requests.take(1)
+                if self.tokens: self.tokens.take(est_tokens)
+        except BaseException:
+            await self._release()
+            raise
+
+    async def _release(self):
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    async def set_max_in_flight(self, n: int):
+        async with self._slots:
+            self.max_in_flight = n
+            self._slots.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, est_tokens: int):
+        await self._acquire(est_tokens)
+        try:
+            yield
+        finally:
+            await self._release()
+
+    def settle(self, est_tokens: int, actual_tokens: Optional[int]):
+        """Correct the TPM bucket once the response reports real usage."""
+        if self.tokens and actual_tokens is not None:
+            self.tokens.take(actual_tokens - est_tokens)
+
+    def pause(self, seconds: float):
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def summary(self) -> str:
+        return f"LLM rate limiter: {self.throttled} throttle responses, {self.waited_s:.1f}s spent waiting for capacity"
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Honour retry-after-ms / retry-after (seconds) / x-ratelimit-reset-* style hints."""
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        v = headers.get(name)
+        if v:
+            try:
+                return max(0.0, float(v) * scale)
+            except ValueError:
+                pass
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        v = headers.get(name)
+        if v:
+            secs = _parse_duration(v)
+            if secs is not None:
+                return secs
+    return None
+
+def _parse_duration(v: str) -> Optional[float]:
+    # OpenAI sends e.g. "1s", "6m0s", "120ms"
+    total, num = 0.0, ""
+    i = 0
+    try:
+        while i < len(v):
+            c = v[i]
+            if c.isdigit() or c == ".":
+                num += c
+            elif v.startswith("ms", i):
+                total += float(num) / 1000; num = ""; i += 1
+            elif c in "hms":
+                total += float(num) * {"h": 3600, "m": 60, "s": 1}[c]; num = ""
+            else:
+                return None
+            i += 1
+    except ValueError:
+        return None
+    return total if not num else None
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,80 @@
+import json, os, re, tempfile, time
+from typing import Dict, Optional
+
+from odoo_rpc import OdooRpc
+
+# ---------------------------------------------------------------------
+# name / SKU -> record id index (persisted with a TTL)
+# ---------------------------------------------------------------------
+def _norm(s: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip().lower())
+
+class RecordIndex:
+    """
+    Built once per TTL by paging search_read over the product model, so workers can
+    open /web#id=... directly instead of going through the PIM kanban search.
+    Names/SKUs shared by several records map to None and are never used.
+    """
+    def __init__(self, by_sku: Dict[str, Optional[int]], by_name: Dict[str, Optional[int]], built_at: float):
+        self.by_sku = by_sku
+        self.by_name = by_name
+        self.built_at = built_at
+        self.hits = self.misses = 0
+
+    @classmethod
+    def build(cls, rpc: OdooRpc, model: str, page_size: int = 2000) -> "RecordIndex":
+        by_sku: Dict[str, Optional[int]] = {}
+        by_name: Dict[str, Optional[int]] = {}
+        offset = 0
+        while True:
+            recs = rpc.search_read(model, [], ["name", "default_code"], limit=page_size, offset=offset)
+            for r in recs:
+                for table, key in ((by_sku, _norm(r.get("default_code") or "")), (by_name, _norm(r.get("name") or ""))):
+                    if key:
+                        table[key] = r["id"] if key not in table else None
+            if len(recs) < page_size:
+                break
+            offset += page_size
+        return cls(by_sku, by_name, time.time())
+
+    @classmethod
+    def load(cls, path: str, ttl_s: float) -> Optional["RecordIndex"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if ttl_s and time.time() - raw.get("built_at", 0) > ttl_s:
+            return None
+        return cls(raw.get("by_sku", {}), raw.get("by_name", {}), raw.get("built_at", 0))
+
+    def save(self, path: str):
+        # a private tmp file per process: shards may build and save the same index at once
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"built_at": self.built_at, "by_sku": self.by_sku, "by_name": self.by_name}, f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def lookup(self, product_name: str, sku: Optional[str]) -> Optional[int]:
+        rid = self.by_sku.get(_norm(sku)) if sku else None
+        if rid is None:
+            rid = self.by_name.get(_norm(product_name))
+        if rid is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return rid
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def summary(self) -> str:
+        return f"Record index: {len(self.by_name)} names / {len(self.by_sku)} SKUs, {self.hits} direct opens, {self.misses} fell back to search"
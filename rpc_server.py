@@ -0,0 +1,178 @@
+import argparse, threading
+from socketserver import ThreadingMixIn
+from typing import Dict, List, Optional, Tuple
+from xmlrpc.client import Fault
+from xmlrpc.server import MultiPathXMLRPCServer, SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+# ---------------------------------------------------------------------
+# local stand-in for Odoo's external API (/xmlrpc/2/common, /object, /db)
+# ---------------------------------------------------------------------
+# field name -> (label, type); labels mirror PAYLOAD_FIELDS in odoo_poc_batch.py
+RPC_FIELDS = {
+    "name": ("Name", "char"),
+    "default_code": ("Internal Reference", "char"),
+    "override_preview_description": ("Override Preview Description", "html"),
+    "override_summary_description": ("Override Summary Description", "html"),
+    "override_full_description": ("Override Full Description", "html"),
+    "seo_name": ("Seo name", "char"),
+    "website_meta_title": ("Website meta title", "char"),
+    "website_meta_description": ("Website meta description", "text"),
+}
+
+ENDPOINTS = ("/xmlrpc/2/common", "/xmlrpc/2/object", "/xmlrpc/2/db")
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ENDPOINTS
+
+class _Server(ThreadingMixIn, MultiPathXMLRPCServer):
+    daemon_threads = True
+
+class FakeOdooRpc:
+    """
+    product.template records live in memory; one login (`login` / `password`) on one
+    database. execute_kw supports fields_get, search_read (domains of `=` / `in`
+    triples, fields, limit, offset) and write, which is all OdooRpc / RpcWriter call.
+    """
+    def __init__(self, products: List[Tuple[str, str]], db: str = "bench", login: str = "admin",
+                 password: str = "admin", model: str = "product.template"):
+        self.db, self.login, self.password, self.model = db, login, password, model
+        self.lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.records: Dict[int, dict] = {
+            i + 1: {"id": i + 1, **{f: "" for f in RPC_FIELDS}, "name": name, "default_code": sku}
+            for i, (name, sku) in enumerate(products)
+        }
+        self.server: Optional[_Server] = None
+
+    def _count(self, what: str):
+        with self.lock:
+            self.calls[what] = self.calls.get(what, 0) + 1
+
+    # ── endpoints ──
+    def authenticate(self, db: str, login: str, password: str, user_agent_env=None):
+        self._count("authenticate")
+        return 2 if (db, login, password) == (self.db, self.login, self.password) else False
+
+    def version(self):
+        return {"server_version": "stand-in"}
+
+    def list_dbs(self):
+        self._count("db.list")
+        return [self.db]
+
+    def execute_kw(self, db: str, uid: int, password: str, model: str, method: str, args: list, kwargs: dict = None):
+        self._count(method)
+        kwargs = kwargs or {}
+        if (db, uid, password) != (self.db, 2, self.password):
+            raise Fault(3, "Access Denied")
+        if model != self.model:
+            raise Fault(2, f"Object {model} doesn't exist")
+        if method == "fields_get":
+            wanted = kwargs.get("attributes") or ["string", "type", "readonly"]
+            return {f: {k: v for k, v in {"string": s, "type": t, "readonly": f == "id"}.items() if k in wanted}
+                    for f, (s, t) in RPC_FIELDS.items()}
+        if method == "search_read":
+            return self._search_read(args[0] if args else kwargs.get("domain", []), kwargs)
+        if method == "write":
+            ids, values = args
+            unknown = set(values) - set(RPC_FIELDS)
+            if unknown:
+                raise Fault(2, f"Invalid field {sorted(unknown)[0]!r} on model {model!r}")
+            with self.lock:
+                for i in ids:
+                    if i not in self.records:
+                        raise Fault(2, f"Record {i} does not exist")
+                    self.records[i].update(values)
+            return True
+        raise Fault(2, f"method {method!r} not supported by the stand-in")
+
+    def _search_read(self, domain: list, kwargs: dict) -> List[dict]:
+        def match(rec: dict) -> bool:
+            for field, op, value in domain:
+                if op == "=" and rec.get(field) != value:
+                    return False
+                if op == "in" and rec.get(field) not in value:
+                    return False
+                if op not in ("=", "in"):
+                    raise Fault(2, f"operator {op!r} not supported by the stand-in")
+            return True
+
+        fields = kwargs.get("fields") or list(RPC_FIELDS)
+        offset, limit = kwargs.get("offset", 0), kwargs.get("limit")
+        with self.lock:
+            hits = [r for _, r in sorted(self.records.items()) if match(r)][offset:]
+            hits = hits[:limit] if limit else hits
+            return [{"id": r["id"], **{f: r.get(f, False) for f in fields}} for r in hits]
+
+    # ── server ──
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.server = _Server((host, port), _Handler, logRequests=False, allow_none=True)
+        for path, funcs in zip(ENDPOINTS, ({"authenticate": self.authenticate, "version": self.version},
+                                           {"execute_kw": self.execute_kw}, {"list": self.list_dbs})):
+            d = SimpleXMLRPCDispatcher(allow_none=True)
+            for name, fn in funcs.items():
+                d.register_function(fn, name)
+            self.server.add_dispatcher(path, d)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+def self_check() -> List[str]:
+    """Drive OdooRpc / RpcWriter against the stand-in; returns the failed checks."""
+    from odoo_rpc import OdooRpc, RpcWriter
+
+    server = FakeOdooRpc([("Wix 51515 WIX Air Filter", "51515"), ("Wix 57060 WIX Spin-On Lube Filter", "57060"),
+                          ("Shop Towel", ""), ("Shop Towel", "")])
+    url = server.start()
+    failed = []
+
+    def check(what: str, ok: bool):
+        print(f"{'ok  ' if ok else 'FAIL'} {what}")
+        if not ok:
+            failed.append(what)
+
+    try:
+        rpc = OdooRpc(f"{url}/web/login", "", server.login, server.password, timeout=5)
+        rpc.authenticate()
+        check("authenticate picks the only database", rpc.db == server.db)
+        w = RpcWriter(rpc, server.model)
+        check("find_product by SKU", w.find_product("renamed", "57060") == 2)
+        check("find_product falls back to name", w.find_product("Wix 51515 WIX Air Filter", "nope") == 1)
+        check("find_product: ambiguous name is not found", w.find_product("Shop Towel", None) is None)
+        check("labels resolve via fields_get / hints", not w.unreachable(
+            ["Override Full Description", "Website Slug", "Meta Title", "Meta Description"]))
+        values = {"Override Full Description": "Line one\nLine two", "Website Slug": "wix-51515-air-filter",
+                  "Meta Title": "Wix 51515 Air Filter", "Nonexistent Label": "x"}
+        written = w.write_labels(1, values)
+        check("write_labels skips unreachable labels", sorted(written) == sorted(set(values) - {"Nonexistent Label"}))
+        check("html fields are written as html", server.records[1]["override_full_description"].startswith("<p>"))
+        back = w.read_labels(1, list(values))
+        # the rich editor keeps paragraphs, read_labels compares plain text (whitespace collapsed)
+        check("read_labels round-trips", all(back.get(l) == " ".join(values[l].split()) for l in written))
+        check("bulk_filled", w.bulk_filled([("Wix 51515 WIX Air Filter", "51515"), ("x", "57060")],
+                                           ["Website Slug", "Meta Title"]) == {("Wix 51515 WIX Air Filter", "51515"): True,
+                                                                              ("x", "57060"): False})
+    finally:
+        server.stop()
+    return failed
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Local stand-in for Odoo's XML-RPC API")
+    ap.add_argument("--serve", action="store_true", help="keep serving (point OD_RPC_URL at it) instead of self-checking")
+    ap.add_argument("--port", type=int, default=8069)
+    ap.add_argument("--product", action="append", default=[], metavar="NAME|SKU", help="seed record (repeatable)")
+    a = ap.parse_args()
+    if not a.serve:
+        raise SystemExit(1 if self_check() else 0)
+    seed = [tuple((p.split("|", 1) + [""])[:2]) for p in a.product] or [("Wix 51515 WIX Air Filter", "51515")]
+    srv = FakeOdooRpc(seed)
+    print(f"serving {len(seed)} product(s) at {srv.start(port=a.port)} (db {srv.db!r}, login admin/admin)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.stop()
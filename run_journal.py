@@ -0,0 +1,146 @@
+import asyncio, csv, os, re, sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# ---------------------------------------------------------------------
+# durable run journal (SQLite, WAL) - one row per product per run
+# ---------------------------------------------------------------------
+DONE_STATUSES = ("updated", "skipped")
+
+def row_key(product_name: str, sku: Optional[str]) -> str:
+    norm = lambda s: re.sub(r"\s+", " ", (s or "").strip().lower())
+    return f"{norm(product_name)}|{norm(sku)}"
+
+def new_run_id() -> str:
+    # the suffix keeps two runs started in the same second apart
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(2).hex()}"
+
+class RunJournal:
+    """
+    Every status/stage change goes through `record`, which only enqueues; a single
+    writer task drains the queue and commits in small batches (WAL + synchronous=FULL),
+    so a crash loses at most the last unflushed batch and those rows simply requeue.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY, source TEXT, started_at TEXT, finished_at TEXT);"
+            "CREATE TABLE IF NOT EXISTS items ("
+            " run_id TEXT, row_key TEXT, name TEXT, sku TEXT, stage TEXT, status TEXT, note TEXT, updated_at TEXT,"
+            " PRIMARY KEY (run_id, row_key));"
+        )
+        self.db.commit()
+        self.run_id: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    # ── run bookkeeping (synchronous, called before/after the async part) ──
+    def latest_resumable_run(self) -> Optional[str]:
+        """Most recent run that crashed or still has failed / unfinished rows."""
+        q = ("SELECT r.run_id FROM runs r WHERE r.finished_at IS NULL OR EXISTS ("
+             " SELECT 1 FROM items i WHERE i.run_id = r.run_id AND i.status NOT IN (%s))"
+             " ORDER BY r.started_at DESC LIMIT 1") % ",".join("?" * len(DONE_STATUSES))
+        row = self.db.execute(q, DONE_STATUSES).fetchone()
+        return row[0] if row else None
+
+    def latest_run(self) -> Optional[str]:
+        row = self.db.execute("SELECT run_id FROM runs ORDER BY started_at DESC, rowid DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def begin(self, run_id: str, source: str, rows: Iterable[Dict[str, str]] = ()):
+        """Register the run and mark `rows` pending (existing rows of a resumed run are kept).
+        Streaming callers pass no rows and record each one as it is queued."""
+        self.run_id = run_id
+        now = datetime.now().isoformat(timespec="seconds")
+        self.db.execute("INSERT OR IGNORE INTO runs (run_id, source, started_at) VALUES (?,?,?)", (run_id, source, now))
+        self.db.execute("UPDATE runs SET finished_at=NULL WHERE run_id=?", (run_id,))
+        self.db.executemany(
+            "INSERT OR IGNORE INTO items (run_id, row_key, name, sku, stage, status, note, updated_at)"
+            " VALUES (?,?,?,?,'queued','pending','',?)",
+            [(run_id, row_key(r["Product Name"], r.get("SKU")), r["Product Name"], r.get("SKU") or "", now) for r in rows],
+        )
+        self.db.commit()
+
+    def done_keys(self, run_id: str) -> Set[str]:
+        q = "SELECT row_key FROM items WHERE run_id=? AND status IN (%s)" % ",".join("?" * len(DONE_STATUSES))
+        return {r[0] for r in self.db.execute(q, (run_id, *DONE_STATUSES))}
+
+    def finish(self):
+        self.db.execute("UPDATE runs SET finished_at=? WHERE run_id=?",
+                        (datetime.now().isoformat(timespec="seconds"), self.run_id))
+        self.db.commit()
+
+    def counts(self, run_id: Optional[str] = None) -> Dict[str, int]:
+        rows = self.db.execute("SELECT status, COUNT(*) FROM items WHERE run_id=? GROUP BY status",
+                               (run_id or self.run_id,))
+        return dict(rows.fetchall())
+
+    def items(self, run_id: Optional[str] = None) -> List[Tuple]:
+        """(row_key, updated_at, name, sku, status, note) for every row of the run."""
+        return self.db.execute(
+            "SELECT row_key, updated_at, name, sku, status, note FROM items WHERE run_id=? ORDER BY updated_at, rowid",
+            (run_id or self.run_id,),
+        ).fetchall()
+
+    def export_csv(self, path: str, run_id: Optional[str] = None) -> int:
+        """Write the run as the familiar batch_log.csv (Timestamp, Product Name, SKU, Status, Note)."""
+        rows = self.db.execute(
+            "SELECT updated_at, name, sku, status, note FROM items WHERE run_id=? ORDER BY updated_at, rowid",
+            (run_id or self.run_id,),
+        ).fetchall()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["Timestamp", "Product Name", "SKU", "Status", "Note"])
+            w.writerows(rows)
+        return len(rows)
+
+    # ── async single writer ──
+    def start_writer(self):
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._drain())
+
+    def record(self, name: str, sku: Optional[str], stage: str, status: Optional[str] = None, note: str = ""):
+        """Enqueue a stage (and optionally status) change; `status=None` keeps the current status."""
+        item = (row_key(name, sku), name, sku or "", stage, status, note, datetime.now().isoformat(timespec="seconds"))
+        if self._queue is not None:
+            self._queue.put_nowait(item)
+        else:
+            self._write([item])
+
+    def _write(self, batch: List[Tuple]):
+        for key, name, sku, stage, status, note, ts in batch:
+            self.db.execute(
+                "INSERT INTO items (run_id, row_key, name, sku, stage, status, note, updated_at)"
+                " VALUES (?,?,?,?,?,COALESCE(?,'pending'),?,?)"
+                " ON CONFLICT(run_id, row_key) DO UPDATE SET stage=excluded.stage,"
+                " status=COALESCE(?, items.status), note=excluded.note, updated_at=excluded.updated_at",
+                (self.run_id, key, name, sku, stage, status, note, ts, status),
+            )
+        self.db.commit()
+
+    async def _drain(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < 200:
+                batch.append(self._queue.get_nowait())
+            stop = batch[-1] is None
+            batch = [b for b in batch if b is not None]
+            if batch:
+                await asyncio.to_thread(self._write, batch)
+            for _ in range(len(batch) + int(stop)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    async def close_writer(self):
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+            await self._writer
+            self._queue = self._writer = None
+
+    def close(self):
+        self.db.close()
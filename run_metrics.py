@@ -0,0 +1,193 @@
+import contextvars, functools, json, os, random, time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# ---------------------------------------------------------------------
+# per-stage latency histograms, per-worker throughput, token usage
+# ---------------------------------------------------------------------
+current_worker: contextvars.ContextVar = contextvars.ContextVar("current_worker", default=None)
+
+RESERVOIR = 10_000  # samples kept per stage for percentiles
+
+def percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+class StageHistogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < RESERVOIR:
+            self.samples.append(seconds)
+        else:
+            j = random.randrange(self.count)  # reservoir sampling keeps percentiles unbiased
+            if j < RESERVOIR:
+                self.samples[j] = seconds
+
+    def summary(self) -> Dict[str, float]:
+        vals = sorted(self.samples)
+        return {
+            "count": self.count, "sum_s": round(self.total, 4), "max_s": round(self.max, 4),
+            "p50_s": round(percentile(vals, 0.50), 4), "p95_s": round(percentile(vals, 0.95), 4),
+            "p99_s": round(percentile(vals, 0.99), 4),
+        }
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, StageHistogram] = {}
+        self.workers: Dict[str, Dict[str, float]] = {}  # worker -> {"items", "busy_s"}
+        self.statuses: Dict[str, int] = {}
+        self.tokens = {"prompt": 0, "cached": 0, "completion": 0, "total": 0, "calls": 0}
+        self.prices: Optional[Dict[str, float]] = None  # USD per 1M tokens: {"input", "cached", "output"}
+        self.item_tokens: Dict[str, int] = {}
+        self.extra: Dict[str, object] = {}  # other subsystems' counters (dict, or callable returning one), exported as-is
+
+    def observe(self, stage: str, seconds: float):
+        h = self.stages.get(stage)
+        if h is None:
+            h = self.stages[stage] = StageHistogram()
+        h.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - t0)
+
+    def timed(self, stage: str):
+        """Decorator for async functions: every call is observed under `stage`."""
+        def deco(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def item_done(self, status: str, seconds: Optional[float] = None):
+        """`seconds` None: settled without a worker (pre-flight skip), kept out of latency and worker stats."""
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if seconds is None:
+            return
+        self.observe("item_total", seconds)
+        w = current_worker.get()
+        if w is not None:
+            ws = self.workers.setdefault(str(w), {"items": 0, "busy_s": 0.0})
+            ws["items"] += 1
+            ws["busy_s"] += seconds
+
+    def add_usage(self, product_names: List[str], usage) -> Optional[int]:
+        """
+        Record an OpenAI `usage` block (cached prompt tokens included when reported);
+        a batched call is split evenly across its products.
+        """
+        if usage is None:
+            return None
+        pt = getattr(usage, "prompt_tokens", 0) or 0
+        ct = getattr(usage, "completion_tokens", 0) or 0
+        tt = getattr(usage, "total_tokens", 0) or pt + ct
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.tokens["cached"] += getattr(details, "cached_tokens", 0) or 0
+        self.tokens["prompt"] += pt
+        self.tokens["completion"] += ct
+        self.tokens["total"] += tt
+        self.tokens["calls"] += 1
+        share = tt // max(1, len(product_names))
+        for n in product_names:
+            self.item_tokens[n] = self.item_tokens.get(n, 0) + share
+        return tt
+
+    def cost_usd(self) -> float:
+        """Spend so far at `prices`; cached prompt tokens are billed at the cached rate."""
+        if not self.prices:
+            return 0.0
+        t = self.tokens
+        return ((t["prompt"] - t["cached"]) * self.prices["input"] + t["cached"] * self.prices["cached"]
+                + t["completion"] * self.prices["output"]) / 1e6
+
+    # ── export ──
+    def snapshot(self) -> dict:
+        elapsed = max(1e-9, time.time() - self.started)
+        items = sum(self.statuses.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "items": items,
+            "items_per_s": round(items / elapsed, 4),
+            "statuses": dict(self.statuses),
+            "stages": {k: h.summary() for k, h in sorted(self.stages.items())},
+            "workers": {w: {"items": int(v["items"]), "busy_s": round(v["busy_s"], 2),
+                            "items_per_s": round(v["items"] / elapsed, 4),
+                            "utilization": round(v["busy_s"] / elapsed, 3)}
+                        for w, v in sorted(self.workers.items())},
+            "tokens": dict(self.tokens),
+            "tokens_per_item": round(self.tokens["total"] / len(self.item_tokens), 1) if self.item_tokens else 0,
+            "cost_usd": round(self.cost_usd(), 4),
+            "cost_per_item_usd": round(self.cost_usd() / len(self.item_tokens), 6) if self.item_tokens else 0,
+            "item_tokens": dict(self.item_tokens),
+            **{k: v() if callable(v) else dict(v) for k, v in self.extra.items()},
+        }
+
+    def prometheus(self, prefix: str = "odoo_seo") -> str:
+        snap = self.snapshot()
+        out = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, s in snap["stages"].items():
+            for q, key in (("0.5", "p50_s"), ("0.95", "p95_s"), ("0.99", "p99_s")):
+                out.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[key]}')
+            out.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {s["sum_s"]}')
+            out.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+        out.append(f"# TYPE {prefix}_items_total counter")
+        for st, n in sorted(snap["statuses"].items()):
+            out.append(f'{prefix}_items_total{{status="{st}"}} {n}')
+        out.append(f"# TYPE {prefix}_worker_items_total counter")
+        for w, v in snap["workers"].items():
+            out.append(f'{prefix}_worker_items_total{{worker="{w}"}} {v["items"]}')
+        out.append(f"# TYPE {prefix}_llm_tokens_total counter")
+        for kind in ("prompt", "cached", "completion", "total"):
+            out.append(f'{prefix}_llm_tokens_total{{kind="{kind}"}} {snap["tokens"][kind]}')
+        out.append(f"# TYPE {prefix}_llm_calls_total counter")
+        out.append(f'{prefix}_llm_calls_total {snap["tokens"]["calls"]}')
+        out.append(f"# TYPE {prefix}_llm_cost_usd_total counter")
+        out.append(f'{prefix}_llm_cost_usd_total {snap["cost_usd"]}')
+        out.append(f"# TYPE {prefix}_run_elapsed_seconds gauge")
+        out.append(f'{prefix}_run_elapsed_seconds {snap["elapsed_s"]}')
+        return "\n".join(out) + "\n"
+
+    def write(self, json_path: str, prom_path: str):
+        for path, body in ((json_path, json.dumps(self.snapshot(), indent=2, ensure_ascii=False)),
+                           (prom_path, self.prometheus())):
+            if not path:
+                continue
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+    def summary(self) -> str:
+        lines = ["Stage latency (count, p50 / p95 / p99 s):"]
+        for stage, s in sorted(self.snapshot()["stages"].items(), key=lambda kv: -kv[1]["sum_s"]):
+            lines.append(f"  {stage}: {s['count']}, {s['p50_s']:.2f} / {s['p95_s']:.2f} / {s['p99_s']:.2f}")
+        t = self.tokens
+        cached_pct = 100 * t["cached"] / t["prompt"] if t["prompt"] else 0.0
+        lines.append(f"LLM tokens: {t['total']} total ({t['prompt']} prompt, {t['cached']} of them cached "
+                     f"({cached_pct:.0f}%), {t['completion']} completion) in {t['calls']} calls")
+        if self.item_tokens:
+            n = len(self.item_tokens)
+            line = f"Per item: {t['prompt'] / n:.0f} prompt + {t['completion'] / n:.0f} completion tokens on average"
+            if self.prices:
+                line += f", ${self.cost_usd() / n:.5f}; run cost ${self.cost_usd():.4f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+metrics = Metrics()
@@ -0,0 +1,99 @@
+import hashlib, json, re, sqlite3, threading, time
+from typing import Optional
+
+# ---------------------------------------------------------------------
+# on-disk cache for generated SEO payloads
+# ---------------------------------------------------------------------
+def normalize_name(product_name: str) -> str:
+    return re.sub(r"\s+", " ", (product_name or "").strip().lower())
+
+def cache_key(product_name: str, model: str, temperature: float, prompt_template: str) -> str:
+    """
+    Any change to the model, temperature or prompt template text yields a new key,
+    so editing the prompt invalidates old entries without a manual purge.
+    """
+    h = hashlib.sha256()
+    for part in (normalize_name(product_name), model, f"{temperature:.3f}", prompt_template):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+class ContentCache:
+    """
+    SQLite-backed payload cache with age + size eviction.
+    mode: "on" (read + write), "refresh" (skip reads, overwrite), "off" (bypass entirely).
+    """
+    def __init__(self, path: str, mode: str = "on", max_entries: int = 50_000, max_age_days: float = 90):
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = self.misses = self.writes = 0
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if mode != "off":
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS payloads ("
+                " key TEXT PRIMARY KEY, product_name TEXT, payload TEXT,"
+                " created_at REAL, used_at REAL)"
+            )
+            self._db.commit()
+            self.evict()
+
+    def get(self, key: str) -> Optional[dict]:
+        if self._db is None or self.mode == "refresh":
+            self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT payload, created_at FROM payloads WHERE key=?", (key,)).fetchone()
+            if row and (not self.max_age or now - row[1] <= self.max_age):
+                self._db.execute("UPDATE payloads SET used_at=? WHERE key=?", (now, key))
+                self._db.commit()
+                self.hits += 1
+                return json.loads(row[0])
+        self.misses += 1
+        return None
+
+    def put(self, key: str, product_name: str, payload: dict):
+        if self._db is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO payloads (key, product_name, payload, created_at, used_at) VALUES (?,?,?,?,?)",
+                (key, product_name, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+            self._db.commit()
+            self.writes += 1
+            self._puts_since_evict += 1
+        if self._puts_since_evict >= 100:
+            self.evict()
+
+    def evict(self):
+        """Drop entries older than max_age, then least-recently-used ones beyond max_entries."""
+        if self._db is None:
+            return
+        with self._lock:
+            if self.max_age:
+                self._db.execute("DELETE FROM payloads WHERE created_at < ?", (time.time() - self.max_age,))
+            if self.max_entries:
+                self._db.execute(
+                    "DELETE FROM payloads WHERE key IN ("
+                    " SELECT key FROM payloads ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._db.commit()
+            self._puts_since_evict = 0
+
+    def summary(self) -> str:
+        if self.mode == "off":
+            return "Content cache: off"
+        return f"Content cache ({self.mode}): {self.hits} hits, {self.misses} misses, {self.writes} writes"
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
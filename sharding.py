@@ -0,0 +1,111 @@
+import csv, hashlib, json, os, subprocess, sys
+from typing import Dict, List, Optional, Tuple
+
+from run_journal import RunJournal
+
+# ---------------------------------------------------------------------
+# sharded runs: stable name+SKU hash -> shard, per-shard files, merge step
+# ---------------------------------------------------------------------
+Shard = Tuple[int, int]  # (index, count), index in 0..count-1
+
+def parse_shard(spec: str) -> Shard:
+    """'2/4' -> (2, 4); shards are numbered 0..K-1."""
+    try:
+        i, k = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"--shard expects i/K (e.g. 0/4), got {spec!r}")
+    if k < 1 or not 0 <= i < k:
+        raise ValueError(f"--shard {spec}: index must be in 0..{k - 1}")
+    return i, k
+
+def shard_of(key: str, count: int) -> int:
+    # sha1 rather than hash(): identical on every process and every host
+    return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big") % count
+
+def shard_path(path: str, shard: Shard) -> str:
+    """run_journal.sqlite3 -> run_journal.shard1of4.sqlite3 (empty paths stay empty)."""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard[0]}of{shard[1]}{ext}"
+
+def run_shards(count: int, script: str, args: List[str]) -> List[int]:
+    """Run every shard of `script` as its own process (stdout per shard) and wait for all."""
+    procs = []
+    for i in range(count):
+        log_path = shard_path("batch_run.log", (i, count))
+        log = open(log_path, "w", encoding="utf-8")
+        p = subprocess.Popen([sys.executable, script, "--shard", f"{i}/{count}", *args],
+                             stdout=log, stderr=subprocess.STDOUT)
+        procs.append((i, p, log, log_path))
+        print(f"Shard {i}/{count}: pid {p.pid}, output -> {log_path}")
+    codes = []
+    for i, p, log, log_path in procs:
+        codes.append(p.wait())
+        log.close()
+        print(f"Shard {i}/{count}: exit {codes[-1]}")
+    return codes
+
+def merge_shards(count: int, journal_path: str, log_path: str, metrics_path: str = "",
+                 run_ids: Optional[Dict[int, str]] = None) -> Dict[str, int]:
+    """
+    Combine the latest run of every shard journal into one batch log (with a Shard
+    column) and, when present, one metrics JSON. Rows seen by two shards are reported.
+    """
+    merged: List[Tuple] = []
+    owner: Dict[str, int] = {}
+    overlaps = 0
+    missing = []
+    for i in range(count):
+        path = shard_path(journal_path, (i, count))
+        if not os.path.exists(path):
+            missing.append(path)
+            continue
+        j = RunJournal(path)
+        try:
+            run_id = (run_ids or {}).get(i) or j.latest_run()
+            for key, ts, name, sku, status, note in j.items(run_id) if run_id else []:
+                if key in owner and owner[key] != i:
+                    overlaps += 1
+                    print(f"[merge] {name} ({sku}) appears in shards {owner[key]} and {i}")
+                owner[key] = i
+                merged.append((ts, name, sku, status, note, i))
+        finally:
+            j.close()
+    if missing:
+        print(f"[merge] no journal for {len(missing)} shard(s): {', '.join(missing)}")
+    merged.sort(key=lambda r: (r[0] or ""))
+    with open(log_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Timestamp", "Product Name", "SKU", "Status", "Note", "Shard"])
+        w.writerows(merged)
+    counts: Dict[str, int] = {}
+    for r in merged:
+        counts[r[3]] = counts.get(r[3], 0) + 1
+    if metrics_path:
+        merge_metrics(count, metrics_path)
+    print(f"Merged {count} shards: {len(merged)} rows -> {log_path} "
+          f"({', '.join(f'{k}={v}' for k, v in sorted(counts.items()))}; {overlaps} overlaps)")
+    return counts
+
+def merge_metrics(count: int, metrics_path: str):
+    """Sum throughput, statuses and tokens across shard metrics; percentiles stay per shard."""
+    out = {"shards": {}, "items": 0, "statuses": {}, "tokens": {}, "cost_usd": 0.0, "items_per_s": 0.0, "elapsed_s": 0.0}
+    for i in range(count):
+        path = shard_path(metrics_path, (i, count))
+        try:
+            with open(path, encoding="utf-8") as f:
+                m = json.load(f)
+        except (OSError, ValueError):
+            continue
+        m.pop("item_tokens", None)
+        out["shards"][str(i)] = m
+        out["items"] += m.get("items", 0)
+        out["items_per_s"] = round(out["items_per_s"] + m.get("items_per_s", 0.0), 4)  # shards run side by side
+        out["elapsed_s"] = max(out["elapsed_s"], m.get("elapsed_s", 0.0))
+        out["cost_usd"] = round(out["cost_usd"] + m.get("cost_usd", 0.0), 4)
+        for section in ("statuses", "tokens"):
+            for k, v in m.get(section, {}).items():
+                out[section][k] = out[section].get(k, 0) + v
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,60 @@
+import hashlib, json, sqlite3, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ---------------------------------------------------------------------
+# incremental sync: per-row content hashes + HTTP validators per source
+# ---------------------------------------------------------------------
+def row_hash(normalized_row: Dict[str, str], columns: Optional[List[str]] = None) -> str:
+    """Hash of the row's relevant columns (all of them by default), order-independent."""
+    items = normalized_row.items() if not columns else ((c, normalized_row.get(c, "")) for c in columns)
+    return hashlib.sha1(json.dumps(sorted(items), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class SyncState:
+    """
+    Remembers, per source, the content hash of every row that finished (updated/skipped)
+    and the ETag / Last-Modified of the last fully successful download.
+    """
+    def __init__(self, path: str, source: str):
+        self.source = source
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS row_hashes ("
+            " source TEXT, row_key TEXT, hash TEXT, synced_at REAL, PRIMARY KEY (source, row_key));"
+            "CREATE TABLE IF NOT EXISTS http_validators ("
+            " source TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, saved_at REAL);"
+        )
+        self.db.commit()
+
+    def unchanged(self, pairs: Iterable[Tuple[str, str]]) -> set:
+        """Row keys (from (row_key, hash) pairs) whose stored hash matches."""
+        pairs = list(pairs)
+        out = set()
+        for i in range(0, len(pairs), 500):
+            part = dict(pairs[i:i + 500])
+            q = "SELECT row_key, hash FROM row_hashes WHERE source=? AND row_key IN (%s)" % ",".join("?" * len(part))
+            for key, h in self.db.execute(q, (self.source, *part)):
+                if part.get(key) == h:
+                    out.add(key)
+        return out
+
+    def mark_synced(self, items: Iterable[Tuple[str, str]]):
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO row_hashes (source, row_key, hash, synced_at) VALUES (?,?,?,?)",
+            [(self.source, k, h, now) for k, h in items],
+        )
+        self.db.commit()
+
+    def validators(self) -> Dict[str, str]:
+        row = self.db.execute("SELECT etag, last_modified FROM http_validators WHERE source=?", (self.source,)).fetchone()
+        return {"etag": row[0], "last_modified": row[1]} if row else {}
+
+    def save_validators(self, etag: Optional[str], last_modified: Optional[str]):
+        if not etag and not last_modified:
+            return
+        self.db.execute("INSERT OR REPLACE INTO http_validators VALUES (?,?,?,?)",
+                        (self.source, etag, last_modified, time.time()))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()